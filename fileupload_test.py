@@ -1,23 +1,458 @@
 #!/usr/bin/env python3
 """
 FileUpload Component Testing
-Tests the simultaneousMode functionality and URL validation
+Tests the simultaneousMode functionality and URL validation, and benchmarks
+uploads to the storage buckets against the local Supabase stand-in
 """
 
+import argparse
+import base64
+import hashlib
+import io
 import json
+import random
 import sys
 import os
-from typing import Dict, List, Any
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
 import re
 
+import httpx
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+# MIME type and extension the admin UI uploads to each bucket from the fix_storage_rls_policies migration
+STORAGE_BUCKET_FILES = {
+    'images': ('image/jpeg', 'jpg'),
+    'videos': ('video/mp4', 'mp4'),
+    'avatars': ('image/png', 'png'),
+    'documents': ('application/pdf', 'pdf'),
+}
+
+# Object sizes the throughput benchmark uploads; a bucket skips the ones over its file_size_limit
+STORAGE_BENCH_SIZES = [64 * 1024, 1024 * 1024, 8 * 1024 * 1024, 32 * 1024 * 1024]
+
+# Objects per Storage API remove() call during cleanup
+STORAGE_REMOVE_CHUNK = 100
+
+# Storage's resumable endpoint takes 6 MiB chunks (only the last may be shorter)
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+# Widths the image derivative pipeline renders (an original is never upscaled)
+IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920]
+
+# Derivative formats, preferred first: MIME type and Pillow encoder options
+IMAGE_VARIANT_FORMATS = {
+    'avif': ('image/avif', {'quality': 50, 'speed': 8}),
+    'webp': ('image/webp', {'quality': 80, 'method': 4}),
+}
+
+# Rendered width a listing requests per layout: project/article cards and the featured hero, at 2x DPR
+IMAGE_LISTING_WIDTHS = {'card': 640, 'hero': 1920}
+
+# Bytes read per step when hashing a file for content-addressed storage
+MEDIA_HASH_CHUNK = 1024 * 1024
+
+# File sizes of the media deduplication corpus
+MEDIA_DEDUP_SIZES = [256 * 1024, 512 * 1024, 1024 * 1024, 2 * 1024 * 1024, 4 * 1024 * 1024]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile (0-100) of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def parse_size(text: str) -> int:
+    """Byte count from a size such as 64K, 1M or 512 (binary units)"""
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*$', text, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * 1024 ** ' KMG'.index(match.group(2).upper() or ' '))
+
+def format_size(size: int) -> str:
+    """Short binary size label (64 KiB, 32 MiB)"""
+    for unit, factor in (('GiB', 1024 ** 3), ('MiB', 1024 ** 2), ('KiB', 1024)):
+        if size >= factor:
+            return f"{size / factor:.4g} {unit}"
+    return f"{size} B"
+
+def validate_file(size: int, mimetype: str, max_size_mb: float = 50, accept: str = "image/*") -> Optional[str]:
+    """Python twin of FileUpload.tsx validateFile() with the component's default props"""
+    if size > max_size_mb * 1024 * 1024:
+        return f"File size must be less than {max_size_mb:g}MB"
+    accepted = [kind.strip() for kind in accept.split(',')]
+    if not any(mimetype.startswith(kind.split('/')[0]) if '*' in kind else mimetype == kind for kind in accepted):
+        return f"File type not supported. Accepted types: {accept}"
+    return None
+
+def precheck_upload(bucket, size: int, mimetype: str) -> Optional[str]:
+    """The bucket's own file_size_limit and allowed_mime_types, checked before any byte is sent"""
+    if bucket.file_size_limit is not None and size > bucket.file_size_limit:
+        return f"File exceeds the {format_size(bucket.file_size_limit)} limit of the {bucket.id} bucket"
+    allowed = bucket.allowed_mime_types or []
+    if allowed and not any(
+        mimetype == kind or (kind.endswith('/*') and mimetype.startswith(kind[:-1])) for kind in allowed
+    ):
+        return f"{mimetype} is not accepted by the {bucket.id} bucket"
+    return None
+
+def image_variant_formats() -> List[str]:
+    """The IMAGE_VARIANT_FORMATS this Pillow build can encode (none without Pillow)"""
+    if Image is None:
+        return []
+    return [fmt for fmt in IMAGE_VARIANT_FORMATS if features.check(fmt)]
+
+def render_image_variants(payload: bytes, widths: List[int], formats: List[str]) -> List[Dict[str, Any]]:
+    """Resize and encode one original into every width and format.
+    
+    Runs in a worker process. Widths are rendered widest first, each from the previous
+    one, and a variant's storage key is the SHA-256 of its bytes.
+    """
+    with Image.open(io.BytesIO(payload)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    variants = []
+    source = image
+    for width in sorted({min(width, image.width) for width in widths}, reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        if width != source.width:
+            source = source.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            mimetype, options = IMAGE_VARIANT_FORMATS[fmt]
+            buffer = io.BytesIO()
+            source.save(buffer, format=fmt.upper(), **options)
+            data = buffer.getvalue()
+            variants.append({
+                'format': fmt,
+                'mimetype': mimetype,
+                'width': width,
+                'height': height,
+                'path': f"variants/{hashlib.sha256(data).hexdigest()}.{fmt}",
+                'data': data
+            })
+    return variants
+
+def synthetic_photo(width: int, height: int, seed: int) -> bytes:
+    """A JPEG with photo-like structure and grain to feed the derivative pipeline"""
+    zoom = 1.0 + (seed % 5) * 0.35
+    detail = Image.effect_mandelbrot((width, height), (-2.2 / zoom, -1.2 / zoom, 1.0 / zoom, 1.2 / zoom), 100)
+    gradient = Image.linear_gradient('L').rotate(seed * 37).resize((width, height))
+    grain = Image.effect_noise((width, height), 24)
+    buffer = io.BytesIO()
+    Image.merge('RGB', (detail, gradient, grain)).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+class ImageDerivativePipeline:
+    """Renders, stores and records the responsive derivatives of images-bucket objects.
+    
+    Runs only when called with source paths, as test_image_derivatives does; no upload
+    hook or worker invokes it. Decoding, resizing and encoding are CPU-bound and run
+    in a process pool. This process uploads what the workers return under the
+    content-hashed keys, so identical renditions are stored once. It then upserts one
+    image_variants row per source, format and width.
+    """
+    
+    def __init__(self, client, pool: Executor, widths: Optional[List[int]] = None,
+                 formats: Optional[List[str]] = None, bucket: str = 'images'):
+        self.client = client
+        self.pool = pool
+        self.widths = widths or IMAGE_VARIANT_WIDTHS
+        self.formats = image_variant_formats() if formats is None else formats
+        self.bucket = bucket
+        self.stored: set = set()
+    
+    def process(self, source_paths: List[str]) -> List[Dict[str, Any]]:
+        """Derive, store and record every source; returns the image_variants rows written"""
+        storage = self.client.storage.from_(self.bucket)
+        futures = {
+            path: self.pool.submit(render_image_variants, storage.download(path), self.widths, self.formats)
+            for path in source_paths
+        }
+        rows = []
+        for source_path, future in futures.items():
+            for variant in future.result():
+                if variant['path'] not in self.stored:
+                    # Content-hashed keys never change meaning, so caches may keep them for a year
+                    storage.upload(variant['path'], variant['data'], {
+                        'content-type': variant['mimetype'], 'cache-control': '31536000', 'upsert': 'true'
+                    })
+                    self.stored.add(variant['path'])
+                rows.append({
+                    'source_path': source_path,
+                    'format': variant['format'],
+                    'width': variant['width'],
+                    'height': variant['height'],
+                    'path': variant['path'],
+                    'bytes': len(variant['data'])
+                })
+        if rows:
+            self.client.table('image_variants').upsert(rows, on_conflict='source_path,format,width').execute()
+        return rows
+
+def hash_file(path: str, chunk_size: int = MEDIA_HASH_CHUNK) -> str:
+    """SHA-256 hex digest of a file, read in chunks rather than loaded whole"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ContentAddressedUploader:
+    """Stores each distinct file once per bucket and tracks who references it.
+    
+    A file is hashed in chunks from disk. If claim_media_object reports that the
+    bucket already holds those bytes, the upload costs one RPC and no transfer.
+    Otherwise the file is streamed to its claimed path under cas/<sha256>/.
+    The path also carries a random suffix: if the last reference is released while
+    the same bytes are claimed again, the new object gets a new key instead of the
+    one about to be removed. release() removes the object once its last referrer
+    has released it.
+    """
+    
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+    
+    def upload(self, file_path: str, mimetype: str, referrer: str) -> Dict[str, Any]:
+        """Upload file_path for referrer unless the bucket already has its content"""
+        content_hash = hash_file(file_path)
+        size = os.path.getsize(file_path)
+        extension = os.path.splitext(file_path)[1].lower()
+        claim = self.client.rpc('claim_media_object', {
+            'bucket': self.bucket,
+            'content_hash': content_hash,
+            'object_path': f"cas/{content_hash}/{uuid.uuid4().hex[:8]}{extension}",
+            'object_bytes': size,
+            'referrer': referrer,
+            'mime_type': mimetype
+        }).execute().data
+        if not claim['existing']:
+            with open(file_path, 'rb') as f:
+                self.client.storage.from_(self.bucket).upload(claim['path'], f, {
+                    'content-type': mimetype, 'cache-control': '31536000', 'upsert': 'true'
+                })
+            self.client.rpc('confirm_media_object', {'bucket': self.bucket, 'content_hash': content_hash}).execute()
+        return {
+            'path': claim['path'],
+            'content_hash': content_hash,
+            'bytes': size,
+            'deduplicated': claim['existing']
+        }
+    
+    def release(self, content_hash: str, referrer: str) -> Optional[str]:
+        """Drop referrer's use of the content; returns the removed path if it was the last one"""
+        path = self.client.rpc('release_media_reference', {
+            'bucket': self.bucket, 'content_hash': content_hash, 'referrer': referrer
+        }).execute().data
+        # A null result comes back as an empty list
+        if not path:
+            return None
+        self.client.storage.from_(self.bucket).remove([path])
+        return path
+
+class ResumableUpload:
+    """TUS 1.0 client for Storage's /upload/resumable endpoint.
+    
+    The payload is split into `parallel` partial uploads (TUS concatenation) sent
+    concurrently in chunk_size PATCHes, each carrying an Upload-Checksum the server
+    verifies; a final Upload-Concat request assembles the object. Part URLs and
+    offsets stay on the instance, so calling upload() again after a dropped
+    connection asks the server (HEAD) how much of each part arrived and sends only
+    the rest. With parallel=1, or a server without concatenation, it is a single
+    upload whose bucket limits are checked before any data is sent.
+    """
+    
+    def __init__(self, http_client: httpx.Client, endpoint: str, headers: Dict[str, str], bucket: str,
+                 name: str, payload: bytes, mimetype: str, chunk_size: int = RESUMABLE_CHUNK_SIZE,
+                 parallel: int = 4, upsert: bool = True, checksum: Optional[str] = 'sha1', max_retries: int = 3):
+        self.http = http_client
+        self.endpoint = endpoint
+        self.headers = headers
+        self.bucket = bucket
+        self.name = name
+        self.payload = payload
+        self.mimetype = mimetype
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+        self.upsert = upsert
+        self.checksum = checksum
+        self.max_retries = max_retries
+        self.parts: List[Dict[str, Any]] = []
+        self.url: Optional[str] = None
+        # Bytes put on the wire over every attempt, and chunks the server refused as corrupted
+        self.bytes_sent = 0
+        self.checksum_retries = 0
+        self._lock = threading.Lock()
+    
+    def _headers(self, **extra: str) -> Dict[str, str]:
+        return {**self.headers, 'Tus-Resumable': '1.0.0', **extra}
+    
+    def _metadata(self) -> str:
+        fields = {'bucketName': self.bucket, 'objectName': self.name,
+                  'contentType': self.mimetype, 'cacheControl': '3600'}
+        return ','.join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in fields.items())
+    
+    def _create_parts(self):
+        response = self.http.options(self.endpoint, headers=self._headers())
+        extensions = response.headers.get('tus-extension', '').split(',')
+        chunks = max(1, -(-len(self.payload) // self.chunk_size))
+        parallel = min(self.parallel, chunks) if 'concatenation' in extensions else 1
+        # Whole chunks per part, so every PATCH but each part's last is chunk_size
+        per_part = -(-chunks // parallel) * self.chunk_size
+        for start in range(0, max(len(self.payload), 1), per_part):
+            length = min(per_part, len(self.payload) - start)
+            if parallel == 1:
+                headers = self._headers(**{'Upload-Length': str(length), 'Upload-Metadata': self._metadata(),
+                                           'x-upsert': str(self.upsert).lower()})
+            else:
+                headers = self._headers(**{'Upload-Length': str(length), 'Upload-Concat': 'partial'})
+            response = self.http.post(self.endpoint, headers=headers)
+            response.raise_for_status()
+            self.parts.append({'url': response.headers['location'], 'start': start, 'length': length,
+                               'offset': 0, 'synced': True})
+    
+    def _sync(self, part: Dict[str, Any]):
+        response = self.http.head(part['url'], headers=self._headers())
+        response.raise_for_status()
+        part['offset'] = int(response.headers['upload-offset'])
+        part['synced'] = True
+    
+    def _send_part(self, part: Dict[str, Any]):
+        # After an interruption, resume from what the server holds rather than what was sent
+        if not part['synced']:
+            self._sync(part)
+        retries = 0
+        while part['offset'] < part['length']:
+            start = part['start'] + part['offset']
+            chunk = self.payload[start:start + min(self.chunk_size, part['length'] - part['offset'])]
+            headers = self._headers(**{'Upload-Offset': str(part['offset']),
+                                       'Content-Type': 'application/offset+octet-stream'})
+            if self.checksum:
+                digest = base64.b64encode(hashlib.new(self.checksum, chunk).digest()).decode()
+                headers['Upload-Checksum'] = f"{self.checksum} {digest}"
+            with self._lock:
+                self.bytes_sent += len(chunk)
+            try:
+                response = self.http.patch(part['url'], content=chunk, headers=headers)
+            except httpx.TransportError:
+                part['synced'] = False
+                raise
+            if response.status_code in (409, 460) and retries < self.max_retries:
+                # 460: corrupted in transit, resend it; 409: offsets disagree, ask the server
+                retries += 1
+                if response.status_code == 460:
+                    with self._lock:
+                        self.checksum_retries += 1
+                else:
+                    self._sync(part)
+                continue
+            response.raise_for_status()
+            part['offset'] = int(response.headers['upload-offset'])
+            retries = 0
+    
+    def upload(self) -> 'ResumableUpload':
+        """Send whatever the server does not have yet; raises on a dropped connection (call again to resume)"""
+        if self.url is not None:
+            return self
+        if not self.parts:
+            self._create_parts()
+        if len(self.parts) == 1:
+            self._send_part(self.parts[0])
+            self.url = self.parts[0]['url']
+            return self
+        with ThreadPoolExecutor(max_workers=len(self.parts)) as executor:
+            list(executor.map(self._send_part, self.parts))
+        response = self.http.post(self.endpoint, headers=self._headers(**{
+            'Upload-Concat': 'final;' + ' '.join(part['url'] for part in self.parts),
+            'Upload-Metadata': self._metadata(),
+            'x-upsert': str(self.upsert).lower()
+        }))
+        response.raise_for_status()
+        self.url = response.headers['location']
+        return self
+
+class FlakyTransport(httpx.BaseTransport):
+    """Test transport that drops the connection once a byte budget of request bodies
+    is used up, or corrupts the next few PATCH bodies in transit"""
+    
+    def __init__(self, inner: httpx.BaseTransport, drop_after_bytes: Optional[int] = None,
+                 corrupt_patches: int = 0):
+        self.inner = inner
+        self.remaining = drop_after_bytes
+        self.corrupt_patches = corrupt_patches
+        self.lock = threading.Lock()
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        delivered, corrupt = len(body), False
+        with self.lock:
+            if body and self.remaining is not None:
+                delivered = min(len(body), self.remaining)
+                self.remaining -= delivered
+            if body and request.method == 'PATCH' and self.corrupt_patches > 0:
+                self.corrupt_patches -= 1
+                corrupt = True
+        if delivered < len(body) or corrupt:
+            # The server still sees the part of the body that made it
+            body = body[:delivered] if delivered < len(body) else bytes([body[0] ^ 0xFF]) + body[1:]
+            headers = [(key, value) for key, value in request.headers.multi_items() if key.lower() != 'content-length']
+            response = self.inner.handle_request(httpx.Request(request.method, request.url, headers=headers, content=body))
+            if delivered < len(request.content):
+                raise httpx.WriteError("Connection dropped mid-request", request=request)
+            return response
+        return self.inner.handle_request(request)
+
 class FileUploadTester:
-    def __init__(self):
+    def __init__(self, storage_concurrency: int = 4, storage_objects: int = 4,
+                 storage_sizes: Optional[List[int]] = None, resumable_size: int = 64 * 1024 * 1024,
+                 resumable_parallel: int = 4, resumable_chunk_size: int = RESUMABLE_CHUNK_SIZE,
+                 image_count: int = 6, image_workers: Optional[int] = None, dedup_uploads: int = 48):
         self.results = {
             'total_tests': 0,
             'passed_tests': 0,
             'failed_tests': 0,
-            'test_details': []
+            'test_details': [],
+            'storage_benchmark': {},
+            'storage_rejections': {},
+            'resumable_uploads': {},
+            'image_derivatives': {},
+            'media_dedup': {}
         }
+        
+        # Storage benchmark: uploads in flight, objects per bucket and size (0 skips it), sizes
+        self.storage_concurrency = storage_concurrency
+        self.storage_objects = storage_objects
+        self.storage_sizes = storage_sizes or STORAGE_BENCH_SIZES
+        # Resumable (TUS) video uploads: object size (0 skips them), parallel parts, chunk size
+        self.resumable_size = resumable_size
+        self.resumable_parallel = resumable_parallel
+        self.resumable_chunk_size = resumable_chunk_size
+        # Image derivatives: originals to process (0 skips them), worker processes
+        self.image_count = image_count
+        self.image_workers = image_workers or os.cpu_count() or 1
+        # Media deduplication: uploads in the duplicated corpus (0 skips it)
+        self.dedup_uploads = dedup_uploads
+        self.test_email = "essaahmedsiddiqui@gmail.com"
+        self.test_password = "shadow"
+        self.storage = None
+        self.supabase = None
+        self.storage_backend = None
+        self.storage_http: Optional[httpx.Client] = None
+        self.storage_url = ''
+        self.storage_headers: Dict[str, str] = {}
+        self.uploaded_objects: Dict[str, List[str]] = {}
+        self.run_id = uuid.uuid4().hex[:8]
 
     def log_test(self, test_name: str, success: bool, message: str = "", details: Any = None):
         """Log test results"""
@@ -368,6 +803,607 @@ class FileUploadTester:
                 f"Error reading FileUpload component: {str(e)}"
             )
 
+    def storage_client(self):
+        """Signed-in storage client served by the local Supabase stand-in, created on first use"""
+        if self.storage is None:
+            from local_supabase import LocalSupabase, LOCAL_SUPABASE_URL
+            self.storage_backend = LocalSupabase(users={self.test_email: self.test_password})
+            connections = max(self.storage_concurrency, self.resumable_parallel)
+            self.storage_http = httpx.Client(
+                transport=self.storage_backend.transport,
+                limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+                timeout=httpx.Timeout(120.0)
+            )
+            client = self.storage_backend.create_client(http_client=self.storage_http)
+            session = client.auth.sign_in_with_password({'email': self.test_email, 'password': self.test_password}).session
+            self.storage_url = f"{LOCAL_SUPABASE_URL}/storage/v1"
+            self.storage_headers = {'apikey': self.storage_backend.anon_key,
+                                    'Authorization': f"Bearer {session.access_token}"}
+            self.supabase = client
+            self.storage = client.storage
+        return self.storage
+
+    def _timed_upload(self, bucket: str, name: str, payload: bytes, mimetype: str) -> Dict[str, Any]:
+        """Upload one object the way FileUpload.tsx does (upsert), timing the round trip"""
+        started = time.perf_counter()
+        try:
+            self.storage_client().from_(bucket).upload(name, payload, {'content-type': mimetype, 'upsert': 'true'})
+            error, status = None, 200
+        except Exception as e:
+            error, status = str(e), getattr(e, 'status', None)
+        if error is None:
+            self.uploaded_objects.setdefault(bucket, []).append(name)
+        return {'latency_ms': (time.perf_counter() - started) * 1000, 'error': error, 'status': status}
+
+    def resumable_upload(self, bucket: str, name: str, payload: bytes, mimetype: str, parallel: int = 1,
+                         http_client: Optional[httpx.Client] = None) -> ResumableUpload:
+        """A TUS upload to the stand-in's resumable endpoint (not started yet)"""
+        self.storage_client()
+        return ResumableUpload(
+            http_client or self.storage_http, f"{self.storage_url}/upload/resumable", self.storage_headers,
+            bucket, name, payload, mimetype, chunk_size=self.resumable_chunk_size, parallel=parallel
+        )
+
+    def _stored_matches(self, bucket: str, name: str, payload: bytes) -> bool:
+        """Download an object and compare it with what was uploaded"""
+        stored = self.storage_client().from_(bucket).download(name)
+        return hashlib.sha256(stored).digest() == hashlib.sha256(payload).digest()
+
+    def test_resumable_uploads(self):
+        """Test chunked resumable video uploads: throughput, interruption and resume, checksums, early limit check"""
+        print("⏯️ Testing Resumable Uploads...")
+        
+        if self.storage_objects <= 0 or self.resumable_size <= 0:
+            return
+        bucket, (mimetype, extension) = 'videos', STORAGE_BUCKET_FILES['videos']
+        payload = os.urandom(self.resumable_size)
+        parallel = self.resumable_parallel
+        
+        try:
+            timings = {}
+            for flow in ('one_shot', 'sequential', 'parallel'):
+                name = f"resumable-{self.run_id}/{flow}.{extension}"
+                started = time.perf_counter()
+                if flow == 'one_shot':
+                    upload = self._timed_upload(bucket, name, payload, mimetype)
+                    if upload['error']:
+                        raise RuntimeError(upload['error'])
+                else:
+                    self.resumable_upload(bucket, name, payload, mimetype,
+                                          parallel=1 if flow == 'sequential' else parallel).upload()
+                    self.uploaded_objects.setdefault(bucket, []).append(name)
+                elapsed = time.perf_counter() - started
+                timings[flow] = {
+                    'ms': round(elapsed * 1000, 3),
+                    'mb_per_s': round(len(payload) / elapsed / 1e6, 2),
+                    'verified': self._stored_matches(bucket, name, payload)
+                }
+            self.results['resumable_uploads']['throughput'] = timings
+            self.log_test(
+                "Resumable Upload - Throughput",
+                all(timing['verified'] for timing in timings.values()),
+                f"{format_size(len(payload))} video: one-shot {timings['one_shot']['mb_per_s']:.1f} MB/s, "
+                f"chunked {timings['sequential']['mb_per_s']:.1f} MB/s, "
+                f"{parallel} parallel parts {timings['parallel']['mb_per_s']:.1f} MB/s; stored bytes verified",
+                timings
+            )
+        except Exception as e:
+            self.log_test(
+                "Resumable Upload - Throughput",
+                False,
+                f"Error uploading {format_size(len(payload))}: {str(e)}"
+            )
+        
+        # The connection drops 60% of the way through; the retry only sends what the server lacks
+        name = f"resumable-{self.run_id}/interrupted.{extension}"
+        drop_after = int(len(payload) * 0.6)
+        flaky = httpx.Client(transport=FlakyTransport(self.storage_backend.transport, drop_after_bytes=drop_after),
+                             timeout=httpx.Timeout(120.0))
+        try:
+            upload = self.resumable_upload(bucket, name, payload, mimetype, parallel=parallel, http_client=flaky)
+            try:
+                upload.upload()
+                dropped = False
+            except httpx.TransportError:
+                dropped = True
+            sent_before = upload.bytes_sent
+            upload.http = self.storage_http
+            upload.upload()
+            self.uploaded_objects.setdefault(bucket, []).append(name)
+            wasted = upload.bytes_sent - len(payload)
+            outcome = {
+                'dropped_after_bytes': drop_after,
+                'bytes_sent': upload.bytes_sent,
+                'resumed_bytes': upload.bytes_sent - sent_before,
+                'wasted_bytes': wasted,
+                'one_shot_retry_wasted_bytes': drop_after,
+                'verified': self._stored_matches(bucket, name, payload)
+            }
+            self.results['resumable_uploads']['interrupted'] = outcome
+            # At most the chunk in flight on each part is lost
+            self.log_test(
+                "Resumable Upload - Interrupt and Resume",
+                dropped and outcome['verified'] and wasted <= len(upload.parts) * self.resumable_chunk_size,
+                f"Dropped after {format_size(drop_after)}; resume sent {format_size(outcome['resumed_bytes'])}, "
+                f"{format_size(max(wasted, 0))} re-sent in total (a one-shot retry re-sends {format_size(drop_after)})"
+                if dropped else "The connection never dropped",
+                outcome
+            )
+        except Exception as e:
+            self.log_test(
+                "Resumable Upload - Interrupt and Resume",
+                False,
+                f"Error resuming the upload: {str(e)}"
+            )
+        finally:
+            flaky.close()
+        
+        name = f"resumable-{self.run_id}/corrupted.{extension}"
+        corrupting = httpx.Client(transport=FlakyTransport(self.storage_backend.transport, corrupt_patches=2),
+                                  timeout=httpx.Timeout(120.0))
+        try:
+            upload = self.resumable_upload(bucket, name, payload, mimetype, parallel=parallel, http_client=corrupting)
+            upload.upload()
+            self.uploaded_objects.setdefault(bucket, []).append(name)
+            verified = self._stored_matches(bucket, name, payload)
+            self.log_test(
+                "Resumable Upload - Checksum Verification",
+                upload.checksum_retries == 2 and verified,
+                f"Server refused {upload.checksum_retries} corrupted chunk(s); they were resent and the stored bytes match"
+                if verified else "Stored object differs from the upload",
+                {"checksum_retries": upload.checksum_retries}
+            )
+        except Exception as e:
+            self.log_test(
+                "Resumable Upload - Checksum Verification",
+                False,
+                f"Error uploading through a corrupting connection: {str(e)}"
+            )
+        finally:
+            corrupting.close()
+        
+        try:
+            limit = self.storage_client().get_bucket(bucket).file_size_limit
+            upload = self.resumable_upload(bucket, f"resumable-{self.run_id}/too-large.{extension}",
+                                           bytes(limit + 1), mimetype)
+            try:
+                upload.upload()
+                status = 200
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+            self.log_test(
+                "Resumable Upload - Limit at Creation",
+                status == 413 and upload.bytes_sent == 0,
+                f"A {format_size(limit + 1)} upload was refused with {status} before any data was sent"
+                if upload.bytes_sent == 0 else f"{format_size(upload.bytes_sent)} sent before the refusal ({status})"
+            )
+        except Exception as e:
+            self.log_test(
+                "Resumable Upload - Limit at Creation",
+                False,
+                f"Error checking the creation-time limit: {str(e)}"
+            )
+
+    def test_image_derivatives(self):
+        """Test the image derivative pipeline: process-pool throughput, stored variants and bytes saved per listing page"""
+        print("🖼️ Testing Image Derivatives...")
+        
+        if self.storage_objects <= 0 or self.image_count <= 0:
+            return
+        if Image is None:
+            print("⚠️ Pillow is not installed, skipping image derivatives (pip install pillow)")
+            return
+        formats = image_variant_formats()
+        if 'avif' not in formats:
+            print("⚠️ This Pillow build cannot encode AVIF, deriving WebP only (Pillow 11.2+ ships it)")
+        
+        sources = [f"derive-{self.run_id}/photo-{i}.jpg" for i in range(self.image_count)]
+        originals = {path: synthetic_photo(2400, 1600, i) for i, path in enumerate(sources)}
+        try:
+            for path, payload in originals.items():
+                upload = self._timed_upload('images', path, payload, 'image/jpeg')
+                if upload['error']:
+                    raise RuntimeError(upload['error'])
+            
+            # One original rendered in this process, then every original through the pool
+            started = time.perf_counter()
+            render_image_variants(originals[sources[0]], IMAGE_VARIANT_WIDTHS, formats)
+            serial_s = time.perf_counter() - started
+            with ProcessPoolExecutor(max_workers=self.image_workers) as pool:
+                pipeline = ImageDerivativePipeline(self.supabase, pool, formats=formats)
+                started = time.perf_counter()
+                rows = pipeline.process(sources)
+                pool_s = time.perf_counter() - started
+            self.uploaded_objects.setdefault('images', []).extend(sorted(pipeline.stored))
+            
+            megapixels = 2400 * 1600 / 1e6
+            throughput = {
+                'images': len(sources),
+                'workers': self.image_workers,
+                'formats': formats,
+                'variants': len(rows),
+                'serial_images_per_s': round(1 / serial_s, 2),
+                'pool_images_per_s': round(len(sources) / pool_s, 2),
+                'pool_megapixels_per_s': round(len(sources) * megapixels / pool_s, 2)
+            }
+            self.results['image_derivatives']['throughput'] = throughput
+            expected = len(sources) * len(IMAGE_VARIANT_WIDTHS) * len(formats)
+            self.log_test(
+                "Image Derivatives - Throughput",
+                len(rows) == expected,
+                f"{len(sources)} 2400x1600 originals into {len(rows)} {'/'.join(formats)} variants: "
+                f"{throughput['pool_images_per_s']:.2f} images/s ({throughput['pool_megapixels_per_s']:.1f} MP/s) "
+                f"with {self.image_workers} worker process(es), stored and recorded, vs "
+                f"{throughput['serial_images_per_s']:.2f} images/s rendering in-process",
+                throughput
+            )
+        except Exception as e:
+            self.log_test(
+                "Image Derivatives - Throughput",
+                False,
+                f"Error deriving images: {str(e)}"
+            )
+            return
+        
+        try:
+            # Every recorded variant is stored under the hash of its bytes, at its recorded size
+            mismatched = []
+            for row in rows:
+                data = self.storage_client().from_('images').download(row['path'])
+                with Image.open(io.BytesIO(data)) as stored:
+                    if (stored.format.lower(), stored.width, stored.height) != (row['format'], row['width'], row['height']) \
+                            or row['path'] != f"variants/{hashlib.sha256(data).hexdigest()}.{row['format']}":
+                        mismatched.append(row['path'])
+            self.log_test(
+                "Image Derivatives - Stored Variants",
+                not mismatched,
+                f"All {len(rows)} variants decode at their recorded format and size under content-hashed keys"
+                if not mismatched else f"{len(mismatched)} variants differ from their image_variants row",
+                {"mismatched": mismatched[:5]} if mismatched else None
+            )
+        except Exception as e:
+            self.log_test(
+                "Image Derivatives - Stored Variants",
+                False,
+                f"Error checking stored variants: {str(e)}"
+            )
+        
+        # A listing page shows every original; it asks pick_image_variants for its layout width
+        urls = [self.storage_client().from_('images').get_public_url(path) for path in sources]
+        original_bytes = sum(len(payload) for payload in originals.values())
+        for layout, min_width in IMAGE_LISTING_WIDTHS.items():
+            try:
+                page = {'original': original_bytes}
+                for fmt in formats:
+                    picked = self.supabase.rpc('pick_image_variants', {
+                        'sources': urls, 'min_width': min_width, 'formats': [fmt]
+                    }).execute().data
+                    if len(picked) != len(urls):
+                        raise RuntimeError(f"{len(urls) - len(picked)} sources have no {fmt} variant")
+                    page[fmt] = sum(variant['bytes'] for variant in picked)
+                self.results['image_derivatives'][layout] = {'min_width': min_width, **page}
+                self.log_test(
+                    f"Image Derivatives - {layout.title()} Page Bytes",
+                    all(page[fmt] < original_bytes for fmt in formats),
+                    f"{len(urls)} images at {min_width}px: {format_size(original_bytes)} of originals vs "
+                    + ", ".join(f"{format_size(page[fmt])} {fmt.upper()} ({1 - page[fmt] / original_bytes:.0%} saved)"
+                                for fmt in formats)
+                )
+            except Exception as e:
+                self.log_test(
+                    f"Image Derivatives - {layout.title()} Page Bytes",
+                    False,
+                    f"Error picking variants: {str(e)}"
+                )
+        
+        try:
+            self.supabase.table('image_variants').delete().in_('source_path', sources).execute()
+        except Exception as e:
+            print(f"⚠️ Could not remove the image_variants rows: {e}")
+
+    def test_media_deduplication(self):
+        """Benchmark content-addressed uploads against plain ones on a corpus with repeated files, and check reference-safe deletes"""
+        print("🧬 Testing Media Deduplication...")
+        
+        if self.storage_objects <= 0 or self.dedup_uploads <= 0:
+            return
+        rng = random.Random(self.dedup_uploads)
+        self.storage_client()
+        uploader = ContentAddressedUploader(self.supabase, 'images')
+        claims: List[Dict[str, Any]] = []
+        
+        with tempfile.TemporaryDirectory() as workdir:
+            # A few files (logos, shared screenshots) recur across projects' additional_images far
+            # more than the rest: upload i picks distinct file k with weight 1 / (k + 1)
+            distinct = max(2, self.dedup_uploads // 4)
+            contents = [os.urandom(rng.choice(MEDIA_DEDUP_SIZES)) for _ in range(distinct)]
+            corpus = []
+            for i in range(self.dedup_uploads):
+                k = rng.choices(range(distinct), weights=[1 / (k + 1) for k in range(distinct)])[0]
+                # Re-uploads arrive under new file names
+                file_path = os.path.join(workdir, f"upload-{i}-{k}.jpg")
+                with open(file_path, 'wb') as f:
+                    f.write(contents[k])
+                corpus.append((file_path, f"projects/{self.run_id}-{i // 4}/additional_images", k))
+            picked = {k for _, _, k in corpus}
+            used = {hashlib.sha256(contents[k]).hexdigest() for k in picked}
+            distinct_bytes = sum(len(contents[k]) for k in picked)
+            total_bytes = sum(len(contents[k]) for _, _, k in corpus)
+            
+            try:
+                started = time.perf_counter()
+                for i, (file_path, _, _) in enumerate(corpus):
+                    with open(file_path, 'rb') as f:
+                        upload = self._timed_upload('images', f"dedup-{self.run_id}/plain/{i}.jpg", f.read(), 'image/jpeg')
+                    if upload['error']:
+                        raise RuntimeError(upload['error'])
+                plain_s = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                for file_path, referrer, _ in corpus:
+                    claim = uploader.upload(file_path, 'image/jpeg', referrer)
+                    claims.append({**claim, 'referrer': referrer})
+                    if not claim['deduplicated']:
+                        self.uploaded_objects.setdefault('images', []).append(claim['path'])
+                dedup_s = time.perf_counter() - started
+                
+                uploaded = [claim for claim in claims if not claim['deduplicated']]
+                stats = {
+                    'uploads': len(corpus),
+                    'distinct_files': len(used),
+                    'plain_stored_bytes': total_bytes,
+                    'dedup_stored_bytes': sum(claim['bytes'] for claim in uploaded),
+                    'dedup_hits': len(claims) - len(uploaded),
+                    'plain_ms': round(plain_s * 1000, 3),
+                    'dedup_ms': round(dedup_s * 1000, 3)
+                }
+                self.results['media_dedup'] = stats
+                self.log_test(
+                    "Media Dedup - Corpus",
+                    len(uploaded) == len(used) and stats['dedup_stored_bytes'] == distinct_bytes,
+                    f"{len(corpus)} uploads of {len(used)} distinct files: stored {format_size(distinct_bytes)} "
+                    f"instead of {format_size(total_bytes)} ({1 - distinct_bytes / total_bytes:.0%} saved), "
+                    f"{stats['dedup_hits']} uploads short-circuited; {stats['dedup_ms']:.0f}ms with hashing "
+                    f"vs {stats['plain_ms']:.0f}ms uploading every file",
+                    stats
+                )
+            except Exception as e:
+                self.log_test(
+                    "Media Dedup - Corpus",
+                    False,
+                    f"Error uploading the corpus: {str(e)}"
+                )
+            
+            try:
+                # Concurrent uploads of one new avatar from several referrers end up as a single object
+                avatar, avatar_bytes = os.path.join(workdir, "avatar.png"), os.urandom(96 * 1024)
+                with open(avatar, 'wb') as f:
+                    f.write(avatar_bytes)
+                avatars = ContentAddressedUploader(self.supabase, 'avatars')
+                referrers = [f"profiles/{self.run_id}-{i}/avatar" for i in range(self.storage_concurrency)]
+                with ThreadPoolExecutor(max_workers=self.storage_concurrency) as executor:
+                    racing = list(executor.map(lambda referrer: avatars.upload(avatar, 'image/png', referrer), referrers))
+                paths = {claim['path'] for claim in racing}
+                self.uploaded_objects.setdefault('avatars', []).extend(paths)
+                
+                # Each release but the last leaves the object in place
+                content_hash = racing[0]['content_hash']
+                kept = []
+                for referrer in referrers[:-1]:
+                    kept.append(avatars.release(content_hash, referrer) is None and self._stored_matches(
+                        'avatars', racing[0]['path'], avatar_bytes))
+                removed = avatars.release(content_hash, referrers[-1])
+                try:
+                    self.storage_client().from_('avatars').download(racing[0]['path'])
+                    gone = False
+                except Exception:
+                    gone = True
+                if gone:
+                    self.uploaded_objects['avatars'] = [p for p in self.uploaded_objects['avatars'] if p not in paths]
+                self.log_test(
+                    "Media Dedup - Reference-Safe Delete",
+                    len(paths) == 1 and all(kept) and removed == racing[0]['path'] and gone,
+                    f"{len(referrers)} concurrent uploads shared one object, which survived "
+                    f"{len(referrers) - 1} releases and was removed with the last reference"
+                    if len(paths) == 1 else f"Concurrent uploads produced {len(paths)} objects",
+                    {"paths": sorted(paths)} if len(paths) != 1 else None
+                )
+            except Exception as e:
+                self.log_test(
+                    "Media Dedup - Reference-Safe Delete",
+                    False,
+                    f"Error checking reference tracking: {str(e)}"
+                )
+        
+        try:
+            # Releasing every corpus reference leaves no stored object and no media row behind
+            for claim in claims:
+                path = uploader.release(claim['content_hash'], claim['referrer'])
+                if path:
+                    self.uploaded_objects['images'].remove(path)
+            leftover = self.supabase.table('media_objects').select('path').in_('content_hash', list(used)).execute().data
+            self.log_test(
+                "Media Dedup - Release",
+                not leftover and not [p for p in self.uploaded_objects.get('images', []) if p.startswith('cas/')],
+                f"Released {len(claims)} references; every deduplicated object was removed with its last one"
+                if not leftover else f"{len(leftover)} media_objects rows are left after releasing every reference"
+            )
+        except Exception as e:
+            self.log_test(
+                "Media Dedup - Release",
+                False,
+                f"Error releasing references: {str(e)}"
+            )
+
+    def _remove_objects(self, bucket: str, names: List[str]) -> int:
+        """Remove objects in remove() batches; returns how many the bucket reported removed"""
+        removed = 0
+        for start in range(0, len(names), STORAGE_REMOVE_CHUNK):
+            chunk = names[start:start + STORAGE_REMOVE_CHUNK]
+            removed += len(self.storage_client().from_(bucket).remove(chunk))
+            tracked = self.uploaded_objects.get(bucket, [])
+            self.uploaded_objects[bucket] = [name for name in tracked if name not in set(chunk)]
+        return removed
+
+    def test_storage_upload_throughput(self):
+        """Benchmark uploads of generated files of each size to every bucket"""
+        print("📦 Testing Storage Upload Throughput...")
+        
+        if self.storage_objects <= 0:
+            return
+        try:
+            buckets = {bucket.id: bucket for bucket in self.storage_client().list_buckets()}
+        except Exception as e:
+            self.log_test(
+                "Storage Throughput - Buckets",
+                False,
+                f"Error listing storage buckets: {str(e)}"
+            )
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.storage_concurrency) as executor:
+            for bucket_id, (mimetype, extension) in STORAGE_BUCKET_FILES.items():
+                bucket = buckets.get(bucket_id)
+                if bucket is None:
+                    self.log_test(
+                        f"Storage Throughput - {bucket_id}",
+                        False,
+                        f"Bucket {bucket_id} does not exist"
+                    )
+                    continue
+                
+                sizes = [size for size in self.storage_sizes
+                         if bucket.file_size_limit is None or size <= bucket.file_size_limit]
+                summary, errors = [], 0
+                try:
+                    for size in sizes:
+                        # Generated up front so only the uploads are timed
+                        payloads = [os.urandom(size) for _ in range(self.storage_objects)]
+                        names = [f"bench-{self.run_id}/{size}-{i}.{extension}" for i in range(len(payloads))]
+                        started = time.perf_counter()
+                        uploads = list(executor.map(
+                            lambda item: self._timed_upload(bucket_id, item[0], item[1], mimetype), zip(names, payloads)
+                        ))
+                        elapsed = time.perf_counter() - started
+                        
+                        latencies = [upload['latency_ms'] for upload in uploads if upload['error'] is None]
+                        stats = {
+                            'bucket': bucket_id,
+                            'size_bytes': size,
+                            'objects': len(uploads),
+                            'errors': len(uploads) - len(latencies),
+                            'concurrency': self.storage_concurrency,
+                            'mb_per_s': round(size * len(latencies) / elapsed / 1e6, 2) if elapsed > 0 else 0.0,
+                            'p50_ms': round(percentile(latencies, 50), 3),
+                            'p95_ms': round(percentile(latencies, 95), 3),
+                            'max_ms': round(max(latencies, default=0.0), 3)
+                        }
+                        self.results['storage_benchmark'][f"{bucket_id}:{format_size(size)}"] = stats
+                        errors += stats['errors']
+                        summary.append(f"{format_size(size)} {stats['mb_per_s']:.1f} MB/s, p50 {stats['p50_ms']:.1f}ms")
+                        # Keep at most one batch in the stand-in's memory
+                        self._remove_objects(bucket_id, names)
+                    
+                    self.log_test(
+                        f"Storage Throughput - {bucket_id}",
+                        bool(sizes) and not errors,
+                        f"{self.storage_objects} objects per size at concurrency {self.storage_concurrency}: "
+                        + "; ".join(summary) if sizes else
+                        f"No benchmark size fits the {format_size(bucket.file_size_limit)} limit",
+                        {"failed_uploads": errors} if errors else None
+                    )
+                except Exception as e:
+                    self.log_test(
+                        f"Storage Throughput - {bucket_id}",
+                        False,
+                        f"Error benchmarking uploads: {str(e)}"
+                    )
+
+    def test_storage_policy_rejections(self):
+        """Measure what a bucket rejecting an upload costs, against checking its limits before sending"""
+        print("🚫 Testing Storage Policy Rejections...")
+        
+        if self.storage_objects <= 0:
+            return
+        try:
+            buckets = {bucket.id: bucket for bucket in self.storage_client().list_buckets()}
+        except Exception as e:
+            self.log_test(
+                "Storage Rejections - Buckets",
+                False,
+                f"Error listing storage buckets: {str(e)}"
+            )
+            return
+        
+        for bucket_id, (mimetype, extension) in STORAGE_BUCKET_FILES.items():
+            bucket = buckets.get(bucket_id)
+            if bucket is None:
+                continue
+            try:
+                # One byte over the bucket limit, and a small file of a type no bucket allows
+                cases = {'mime_type': (1024, 'application/x-msdownload', '415')}
+                if bucket.file_size_limit is not None:
+                    cases['oversize'] = (bucket.file_size_limit + 1, mimetype, '413')
+                
+                outcomes = {}
+                for case, (size, case_mimetype, expected) in cases.items():
+                    upload = self._timed_upload(bucket_id, f"reject-{self.run_id}/{case}.{extension}",
+                                                os.urandom(size), case_mimetype)
+                    started = time.perf_counter()
+                    precheck = precheck_upload(bucket, size, case_mimetype)
+                    outcomes[case] = {
+                        'status': str(upload['status']),
+                        'expected': expected,
+                        'bytes_sent': size,
+                        'rejection_ms': round(upload['latency_ms'], 3),
+                        'precheck_ms': round((time.perf_counter() - started) * 1000, 4),
+                        'precheck_rejects': precheck is not None,
+                        # FileUpload.tsx's defaults (maxSizeMB 50) with the bucket's file type accepted
+                        'file_upload_rejects': validate_file(size, case_mimetype, accept=mimetype) is not None
+                    }
+                self.results['storage_rejections'][bucket_id] = outcomes
+                
+                rejected = all(outcome['status'] == outcome['expected'] for outcome in outcomes.values())
+                summary = [
+                    f"{outcome['status']} {case} after sending {format_size(outcome['bytes_sent'])} "
+                    f"in {outcome['rejection_ms']:.1f}ms"
+                    + ("" if outcome['file_upload_rejects'] else " (FileUpload.tsx's check lets it through)")
+                    for case, outcome in outcomes.items()
+                ]
+                self.log_test(
+                    f"Storage Rejections - {bucket_id}",
+                    rejected and all(outcome['precheck_rejects'] for outcome in outcomes.values()),
+                    "; ".join(summary) + f"; a bucket-limit pre-check rejects both in "
+                    f"{max(outcome['precheck_ms'] for outcome in outcomes.values()):.3f}ms"
+                    if rejected else f"Expected {', '.join(o['expected'] for o in outcomes.values())}, "
+                    f"got {', '.join(o['status'] for o in outcomes.values())}"
+                )
+            except Exception as e:
+                self.log_test(
+                    f"Storage Rejections - {bucket_id}",
+                    False,
+                    f"Error measuring rejections: {str(e)}"
+                )
+
+    def cleanup_storage_objects(self):
+        """Remove every object the storage suites left behind"""
+        leftovers = {bucket: list(names) for bucket, names in self.uploaded_objects.items() if names}
+        if not leftovers:
+            return
+        try:
+            removed = sum(self._remove_objects(bucket, names) for bucket, names in leftovers.items())
+            self.log_test(
+                "Storage Cleanup - Objects",
+                True,
+                f"Removed {removed} objects from {len(leftovers)} bucket(s)"
+            )
+        except Exception as e:
+            self.log_test(
+                "Storage Cleanup - Objects",
+                False,
+                f"Error removing storage objects: {str(e)}"
+            )
+
     def print_summary(self):
         """Print test summary"""
         print("\n" + "="*80)
@@ -389,6 +1425,49 @@ class FileUploadTester:
             if result['message']:
                 print(f"    💬 {result['message']}")
         
+        if self.results['storage_benchmark']:
+            print("\n📦 STORAGE UPLOAD BENCHMARK:")
+            print("-" * 80)
+            print(f"{'Bucket':<12}{'Size':>10}{'Objects':>9}{'MB/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'Max ms':>9}{'Errors':>8}")
+            for stats in self.results['storage_benchmark'].values():
+                print(
+                    f"{stats['bucket']:<12}{format_size(stats['size_bytes']):>10}{stats['objects']:>9}"
+                    f"{stats['mb_per_s']:>9.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+                    f"{stats['max_ms']:>9.1f}{stats['errors']:>8}"
+                )
+        
+        if self.results['storage_rejections']:
+            print("\n🚫 STORAGE REJECTION COST:")
+            print("-" * 80)
+            print(f"{'Bucket':<12}{'Case':<12}{'Status':>7}{'Sent':>12}{'Upload ms':>11}{'Pre-check ms':>14}")
+            for bucket_id, outcomes in self.results['storage_rejections'].items():
+                for case, outcome in outcomes.items():
+                    print(
+                        f"{bucket_id:<12}{case:<12}{outcome['status']:>7}{format_size(outcome['bytes_sent']):>12}"
+                        f"{outcome['rejection_ms']:>11.1f}{outcome['precheck_ms']:>14.4f}"
+                    )
+        
+        derivatives = self.results['image_derivatives']
+        if any(layout in derivatives for layout in IMAGE_LISTING_WIDTHS):
+            formats = derivatives['throughput']['formats']
+            print("\n🖼️ IMAGE DERIVATIVE PAGE BYTES:")
+            print("-" * 80)
+            print(f"{'Layout':<10}{'Width':>7}{'Originals':>12}" + "".join(f"{fmt.upper():>12}" for fmt in formats))
+            for layout in IMAGE_LISTING_WIDTHS:
+                if layout in derivatives:
+                    page = derivatives[layout]
+                    print(f"{layout:<10}{page['min_width']:>7}{format_size(page['original']):>12}"
+                          + "".join(f"{format_size(page[fmt]):>12}" for fmt in formats))
+        
+        dedup = self.results['media_dedup']
+        if dedup:
+            print("\n🧬 MEDIA DEDUPLICATION:")
+            print("-" * 80)
+            print(f"{'Mode':<10}{'Uploads':>9}{'Stored':>12}{'Time ms':>10}")
+            print(f"{'plain':<10}{dedup['uploads']:>9}{format_size(dedup['plain_stored_bytes']):>12}{dedup['plain_ms']:>10.0f}")
+            print(f"{'dedup':<10}{dedup['uploads'] - dedup['dedup_hits']:>9}"
+                  f"{format_size(dedup['dedup_stored_bytes']):>12}{dedup['dedup_ms']:>10.0f}")
+        
         print("\n" + "="*80)
         
         # Determine overall status
@@ -409,12 +1488,52 @@ class FileUploadTester:
         self.test_project_editor_fileupload_usage()
         self.test_url_validation_patterns()
         self.test_component_props_and_features()
+        self.test_storage_upload_throughput()
+        self.test_storage_policy_rejections()
+        self.test_resumable_uploads()
+        self.test_image_derivatives()
+        self.test_media_deduplication()
+        self.cleanup_storage_objects()
         
         return self.print_summary()
 
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="FileUpload component checks and storage upload benchmarks")
+    parser.add_argument('--storage-concurrency', type=int, default=4, help="Storage benchmark: uploads in flight")
+    parser.add_argument('--storage-objects', type=int, default=4,
+                        help="Storage benchmark: objects uploaded per bucket and size (0 skips the storage suites)")
+    parser.add_argument('--storage-sizes', type=lambda value: [parse_size(size) for size in value.split(',') if size.strip()],
+                        default=STORAGE_BENCH_SIZES,
+                        help="Storage benchmark: comma-separated object sizes such as 64K,1M,8M,32M")
+    parser.add_argument('--resumable-size', type=parse_size, default=64 * 1024 * 1024,
+                        help="Resumable uploads: video size to upload, interrupt and resume (0 skips them)")
+    parser.add_argument('--resumable-parallel', type=int, default=4,
+                        help="Resumable uploads: partial uploads sent in parallel and concatenated")
+    parser.add_argument('--resumable-chunk', type=parse_size, default=RESUMABLE_CHUNK_SIZE,
+                        help="Resumable uploads: bytes per PATCH (Storage expects 6M)")
+    parser.add_argument('--image-count', type=int, default=6,
+                        help="Image derivatives: 2400x1600 originals to process (0 skips them)")
+    parser.add_argument('--image-workers', type=int, default=None,
+                        help="Image derivatives: worker processes (defaults to the CPU count)")
+    parser.add_argument('--dedup-uploads', type=int, default=48,
+                        help="Media deduplication: uploads in the corpus of repeated files (0 skips it)")
+    return parser.parse_args(argv)
+
 def main():
     """Main test execution function"""
-    tester = FileUploadTester()
+    args = parse_args()
+    tester = FileUploadTester(
+        storage_concurrency=args.storage_concurrency,
+        storage_objects=args.storage_objects,
+        storage_sizes=args.storage_sizes,
+        resumable_size=args.resumable_size,
+        resumable_parallel=args.resumable_parallel,
+        resumable_chunk_size=args.resumable_chunk,
+        image_count=args.image_count,
+        image_workers=args.image_workers,
+        dedup_uploads=args.dedup_uploads
+    )
     success = tester.run_all_tests()
     
     # Exit with appropriate code
@@ -0,0 +1,2771 @@
+"""
+Local Supabase Stand-in
+In-process PostgREST and auth endpoints backed by an in-memory store whose schema
+(tables, defaults, keys, indexes, RLS policies and triggers) is loaded from
+supabase/migrations, so the backend tester can run offline without WAN latency.
+
+The stand-in is an httpx transport: the real supabase client and its query
+builders are used unchanged, only the HTTP round trip is served in-process.
+
+SQL functions and trigger bodies are not executed here: each has a Python twin
+(@rpc_function, trigger handlers). The SQL itself runs against real Postgres in
+supabase/tests (`supabase test db`, the Migrations workflow), so change both together.
+"""
+
+import base64
+import functools
+import hashlib
+import heapq
+import hmac
+import json
+import math
+import os
+import re
+import secrets
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supabase', 'migrations')
+LOCAL_SUPABASE_URL = "http://127.0.0.1:54321"
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns', 'or', 'and', 'not.or', 'not.and'}
+
+# Python implementations of SQL functions, keyed by the name the migrations define.
+# A function is only callable (as a trigger or over /rpc) once a migration creates it.
+TRIGGER_FUNCTIONS: Dict[str, Callable] = {}
+RPC_FUNCTIONS: Dict[str, Callable] = {}
+# GENERATED ALWAYS AS (...) STORED expressions, keyed by (table, column)
+GENERATED_COLUMNS: Dict[Tuple[str, str], Callable[[Dict[str, Any]], Any]] = {}
+
+def trigger_function(name: str):
+    """Register a Python implementation of a plpgsql trigger function"""
+    def register(func: Callable) -> Callable:
+        TRIGGER_FUNCTIONS[name] = func
+        return func
+    return register
+
+def rpc_function(name: str):
+    """Register a Python implementation of a function exposed over /rest/v1/rpc"""
+    def register(func: Callable) -> Callable:
+        RPC_FUNCTIONS[name] = func
+        return func
+    return register
+
+
+def generated_column(table: str, column: str):
+    """Register a Python implementation of a generated column's expression"""
+    def register(func: Callable) -> Callable:
+        GENERATED_COLUMNS[(table, column)] = func
+        return func
+    return register
+
+
+class PostgrestError(Exception):
+    """Error rendered in PostgREST's JSON error format"""
+
+    def __init__(self, status: int, code: str, message: str,
+                 details: Optional[str] = None, hint: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.details = details
+        self.hint = hint
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'code': self.code, 'message': self.message, 'details': self.details, 'hint': self.hint}
+
+
+# ---------------------------------------------------------------------------
+# Value handling
+# ---------------------------------------------------------------------------
+
+# now() is the transaction start time in PostgreSQL; LocalDatabase.transaction pins it here
+_transaction_clock = threading.local()
+
+def now_timestamp() -> str:
+    pinned = getattr(_transaction_clock, 'now', None)
+    return pinned or canonical_timestamp(datetime.now(timezone.utc))
+
+def canonical_timestamp(value: Any) -> str:
+    """Fixed-width UTC ISO timestamp, so string order matches chronological order"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip().replace(' ', 'T', 1)
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            raise PostgrestError(400, '22007', f'invalid input syntax for type timestamp with time zone: "{value}"')
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+def column_kind(sql_type: str) -> str:
+    """Collapse a SQL type name into the handful of kinds the stand-in distinguishes"""
+    sql_type = sql_type.lower().strip()
+    if sql_type.endswith('[]'):
+        return 'array'
+    if sql_type.startswith('uuid'):
+        return 'uuid'
+    if sql_type.startswith(('int', 'bigint', 'smallint', 'serial', 'bigserial')):
+        return 'int'
+    if sql_type.startswith(('numeric', 'decimal', 'real', 'double', 'float')):
+        return 'float'
+    if sql_type.startswith('bool'):
+        return 'bool'
+    if sql_type.startswith(('timestamp', 'date')):
+        return 'timestamp'
+    if sql_type.startswith('json'):
+        return 'json'
+    if sql_type.startswith('tsvector'):
+        return 'tsvector'
+    return 'text'
+
+def parse_array_literal(text: str) -> List[str]:
+    """Parse a PostgreSQL array literal such as {a,"b c"}"""
+    text = text.strip()
+    if not (text.startswith('{') and text.endswith('}')):
+        raise PostgrestError(400, '22P02', f'malformed array literal: "{text}"')
+    return [item for item in split_top_level(text[1:-1], ',') if item != ''] if text[1:-1].strip() else []
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """Split on separator outside parentheses and double quotes, unquoting quoted items"""
+    items, current, depth, quoted = [], '', 0, False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\' and quoted and i + 1 < len(text):
+            current += text[i + 1]
+            i += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == separator and depth == 0 and not quoted:
+            items.append(current)
+            current = ''
+        else:
+            current += char
+        i += 1
+    items.append(current)
+    return [_unquote(item.strip()) for item in items]
+
+def _unquote(text: str) -> str:
+    if len(text) >= 2 and text[0] == '"' and text[-1] == '"' and '(' not in text[1:-1]:
+        return text[1:-1]
+    return text
+
+def normalize_value(table: 'Table', column: 'Column', value: Any) -> Any:
+    """Coerce a JSON value into the column's type, raising PostgreSQL-style errors"""
+    if value is None:
+        return None
+    kind = column.kind
+    try:
+        if kind == 'uuid':
+            return str(uuid.UUID(str(value)))
+        if kind == 'int':
+            if isinstance(value, bool):
+                raise ValueError
+            return int(value)
+        if kind == 'float':
+            return float(value)
+        if kind == 'bool':
+            if isinstance(value, bool):
+                return value
+            if str(value).lower() in ('true', 't'):
+                return True
+            if str(value).lower() in ('false', 'f'):
+                return False
+            raise ValueError
+        if kind == 'timestamp':
+            return canonical_timestamp(value)
+        if kind == 'array':
+            return list(value) if isinstance(value, (list, tuple)) else parse_array_literal(str(value))
+        if kind == 'json':
+            return value
+        if kind == 'text' and isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value if isinstance(value, str) else str(value).lower() if isinstance(value, bool) else str(value)
+    except (ValueError, TypeError):
+        raise PostgrestError(400, '22P02', f'invalid input syntax for type {column.sql_type}: "{value}"')
+
+def coerce_filter_value(raw: str, kind: Optional[str], sample: Any = None) -> Any:
+    """Coerce a filter value from the query string for comparison with stored values"""
+    if kind is None:
+        kind = ('bool' if isinstance(sample, bool) else 'int' if isinstance(sample, int)
+                else 'float' if isinstance(sample, float) else 'text')
+    try:
+        if kind == 'int':
+            return int(raw)
+        if kind == 'float':
+            return float(raw)
+        if kind == 'bool':
+            return raw.lower() in ('true', 't', '1')
+        if kind == 'timestamp':
+            return canonical_timestamp(raw)
+        if kind == 'uuid':
+            return str(uuid.UUID(raw))
+    except (ValueError, TypeError):
+        raise PostgrestError(400, '22P02', f'invalid input syntax for type {kind}: "{raw}"')
+    return raw
+
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+
+# PostgreSQL's english.stop list
+ENGLISH_STOPWORDS = frozenset('''
+    i me my myself we our ours ourselves you your yours yourself yourselves he him his himself
+    she her hers herself it its itself they them their theirs themselves what which who whom
+    this that these those am is are was were be been being have has had having do does did
+    doing a an the and but if or because as until while of at by for with about against
+    between into through during before after above below to from up down in out on off over
+    under again further then once here there when where why how all any both each few more
+    most other some such no nor not only own same so than too very s t can will just don
+    should now
+'''.split())
+
+# ts_rank's default weights for labels D, C, B, A
+TSVECTOR_WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+def english_lexeme(word: str) -> Optional[str]:
+    """Normalize a word like the english configuration: lowercase, stopwords dropped, light stemming.
+    
+    The suffix stripping is much simpler than Snowball, but documents and queries go
+    through the same function, so matches stay consistent.
+    """
+    word = word.lower()
+    if word in ENGLISH_STOPWORDS:
+        return None
+    for suffix, replacement in (('sses', 'ss'), ('ies', 'i'), ('xes', 'x'), ('ches', 'ch'), ('shes', 'sh'),
+                                ('ing', ''), ('ed', ''), ('s', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word.endswith(('ss', 'us', 'is')):
+                break
+            word = word[:-len(suffix)] + replacement
+            break
+    # cache/caching -> cach, release -> releas
+    return word[:-1] if word.endswith('e') and len(word) >= 4 else word
+
+def to_tsvector(text: str, weight: str = 'D') -> Dict[str, List[Tuple[int, str]]]:
+    """setweight(to_tsvector('english', text), weight) as lexeme -> [(position, weight)]"""
+    vector: Dict[str, List[Tuple[int, str]]] = {}
+    for position, word in enumerate(re.findall(r'[a-z0-9]+', text.lower()), start=1):
+        lexeme = english_lexeme(word)
+        if lexeme is not None:
+            vector.setdefault(lexeme, []).append((position, weight))
+    return vector
+
+def tsvector_concat(*vectors: Dict[str, List[Tuple[int, str]]]) -> Dict[str, List[Tuple[int, str]]]:
+    """tsvector || tsvector: positions of each operand are shifted past the previous one"""
+    result: Dict[str, List[Tuple[int, str]]] = {}
+    offset = 0
+    for vector in vectors:
+        last = 0
+        for lexeme, positions in vector.items():
+            result.setdefault(lexeme, []).extend((position + offset, weight) for position, weight in positions)
+            last = max([last] + [position for position, _ in positions])
+        offset += last
+    return result
+
+def tsvector_text(vector: Dict[str, List[Tuple[int, str]]]) -> str:
+    """Text form PostgREST returns, e.g. 'cache':3A,7C 'data':1A (weight D is implicit)"""
+    return ' '.join(
+        f"'{lexeme}':" + ','.join(f"{position}{'' if weight == 'D' else weight}" for position, weight in positions)
+        for lexeme, positions in sorted(vector.items())
+    )
+
+@functools.lru_cache(maxsize=8192)
+def parse_tsvector(text: Optional[str]) -> Dict[str, List[Tuple[int, str]]]:
+    """Parse the text form back into lexeme -> [(position, weight)] (cached; do not mutate)"""
+    vector: Dict[str, List[Tuple[int, str]]] = {}
+    for lexeme, positions in re.findall(r"'((?:[^']|'')*)'(?::([\dA-D,]+))?", text or ''):
+        vector[lexeme.replace("''", "'")] = [
+            (int(match.group(1)), match.group(2) or 'D')
+            for match in re.finditer(r'(\d+)([A-D]?)', positions or '')
+        ]
+    return vector
+
+def websearch_to_tsquery(text: str) -> List[List[Tuple[bool, List[str]]]]:
+    """Parse web search syntax into OR'ed alternatives of (negated, phrase lexemes) clauses"""
+    alternatives: List[List[Tuple[bool, List[str]]]] = [[]]
+    for match in re.finditer(r'(-?)"([^"]*)"?|(\S+)', text):
+        if match.group(3) is not None and match.group(3).lower() == 'or':
+            if alternatives[-1]:
+                alternatives.append([])
+            continue
+        negated = match.group(1) == '-' or (match.group(3) or '').startswith('-')
+        words = re.findall(r'[a-z0-9]+', (match.group(2) if match.group(3) is None else match.group(3)).lower())
+        lexemes = [lexeme for lexeme in (english_lexeme(word) for word in words) if lexeme is not None]
+        if lexemes:
+            alternatives[-1].append((negated, lexemes))
+    return [alternative for alternative in alternatives if alternative]
+
+def _phrase_present(vector: Dict[str, List[Tuple[int, str]]], lexemes: List[str]) -> bool:
+    starts = {position for position, _ in vector.get(lexemes[0], [])}
+    for offset, lexeme in enumerate(lexemes[1:], start=1):
+        following = {position - offset for position, _ in vector.get(lexeme, [])}
+        starts &= following
+    return bool(starts)
+
+def tsquery_matches(vector: Dict[str, List[Tuple[int, str]]], query: List[List[Tuple[bool, List[str]]]]) -> bool:
+    """vector @@ query"""
+    return any(
+        all(_phrase_present(vector, lexemes) != negated for negated, lexemes in alternative)
+        for alternative in query
+    )
+
+def ts_rank(vector: Dict[str, List[Tuple[int, str]]], query: List[List[Tuple[bool, List[str]]]]) -> float:
+    """Approximates ts_rank: label-weighted occurrences, each extra occurrence counting less"""
+    lexemes = {lexeme for alternative in query for negated, phrase in alternative if not negated for lexeme in phrase}
+    if not lexemes:
+        return 0.0
+    score = 0.0
+    for lexeme in lexemes:
+        weights = sorted((TSVECTOR_WEIGHTS[weight] for _, weight in vector.get(lexeme, [])), reverse=True)
+        score += sum(weight / (i + 1) ** 2 for i, weight in enumerate(weights))
+    return round(score / len(lexemes), 6)
+
+
+# ---------------------------------------------------------------------------
+# Schema
+# ---------------------------------------------------------------------------
+
+class Column:
+    def __init__(self, name: str, sql_type: str, nullable: bool = True,
+                 default: Optional[Callable[[], Any]] = None, generated: bool = False):
+        self.name = name
+        self.sql_type = sql_type
+        self.kind = column_kind(sql_type)
+        self.nullable = nullable
+        self.default = default
+        self.generated = generated
+
+
+class ForeignKey:
+    def __init__(self, name: str, table: str, columns: Tuple[str, ...], ref_table: str,
+                 ref_columns: Tuple[str, ...], on_delete: str = 'NO ACTION'):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.ref_table = ref_table
+        self.ref_columns = ref_columns
+        self.on_delete = on_delete
+
+
+class Index:
+    def __init__(self, name: str, table: str, columns: List[Tuple[str, bool]],
+                 method: str = 'btree', where: Optional[str] = None, unique: bool = False):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.method = method
+        self.where = where
+        self.unique = unique
+
+
+class Trigger:
+    def __init__(self, name: str, table: str, timing: str, events: Set[str], function: str):
+        self.name = name
+        self.table = table
+        self.timing = timing
+        self.events = events
+        self.function = function
+
+
+class Table:
+    """Rows of one table plus the unique maps and hash indexes that back lookups"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns: Dict[str, Column] = {}
+        self.primary_key: Tuple[str, ...] = ()
+        self.uniques: List[Tuple[str, Tuple[str, ...]]] = []
+        self.foreign_keys: List[ForeignKey] = []
+        self.indexes: List[Index] = []
+        self.triggers: List[Trigger] = []
+        self.rls_enabled = False
+        self.policies: List[Tuple[str, Optional[str]]] = []
+        self.rows: Dict[Tuple, Dict[str, Any]] = {}
+        self.unique_maps: Dict[Tuple[str, ...], Dict[Tuple, Tuple]] = {}
+        self.hash_indexes: Dict[str, Dict[Any, Set[Tuple]]] = {}
+        # GIN indexes over tsvector columns: lexeme -> keys of rows containing it
+        self.gin_indexes: Dict[str, Dict[str, Set[Tuple]]] = {}
+        self._row_counter = 0
+
+    def key_of(self, row: Dict[str, Any]) -> Tuple:
+        if self.primary_key:
+            return tuple(row[c] for c in self.primary_key)
+        self._row_counter += 1
+        return (self._row_counter,)
+
+    def build_indexes(self):
+        """(Re)build unique maps and hash indexes from the declared constraints"""
+        constraints = []
+        if self.primary_key:
+            constraints.append(self.primary_key)
+        constraints.extend(cols for _, cols in self.uniques)
+        self.unique_maps = {cols: {} for cols in constraints}
+
+        hashed = {fk.columns[0] for fk in self.foreign_keys}
+        hashed.update(index.columns[0][0] for index in self.indexes if index.columns[0][0] in self.columns)
+        hashed.update(cols[0] for cols in constraints)
+        self.hash_indexes = {
+            col: {} for col in hashed
+            if col in self.columns and self.columns[col].kind not in ('array', 'json', 'tsvector')
+        }
+        self.gin_indexes = {
+            index.columns[0][0]: {} for index in self.indexes
+            if index.method == 'gin' and index.columns[0][0] in self.columns
+            and self.columns[index.columns[0][0]].kind == 'tsvector'
+        }
+        for key, row in self.rows.items():
+            self.index_add(key, row)
+
+    def index_add(self, key: Tuple, row: Dict[str, Any]):
+        for cols, mapping in self.unique_maps.items():
+            values = tuple(row[c] for c in cols)
+            if None not in values:
+                mapping[values] = key
+        for col, mapping in self.hash_indexes.items():
+            mapping.setdefault(row[col], set()).add(key)
+        for col, mapping in self.gin_indexes.items():
+            for lexeme in parse_tsvector(row[col]):
+                mapping.setdefault(lexeme, set()).add(key)
+
+    def index_remove(self, key: Tuple, row: Dict[str, Any]):
+        for cols, mapping in self.unique_maps.items():
+            values = tuple(row[c] for c in cols)
+            if mapping.get(values) == key:
+                del mapping[values]
+        for col, mapping in self.hash_indexes.items():
+            keys = mapping.get(row[col])
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del mapping[row[col]]
+        for col, mapping in self.gin_indexes.items():
+            for lexeme in parse_tsvector(row[col]):
+                keys = mapping.get(lexeme)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del mapping[lexeme]
+
+    def lookup(self, columns: Tuple[str, ...], values: Tuple) -> List[Tuple]:
+        """Keys of rows whose columns equal values, using an index where one exists"""
+        if columns in self.unique_maps:
+            key = self.unique_maps[columns].get(values)
+            return [key] if key is not None else []
+        if columns[0] in self.hash_indexes:
+            keys = self.hash_indexes[columns[0]].get(values[0], set())
+            return [k for k in keys if all(self.rows[k][c] == v for c, v in zip(columns, values))]
+        return [k for k, row in self.rows.items() if all(row[c] == v for c, v in zip(columns, values))]
+
+    def constraint_name(self, columns: Tuple[str, ...], suffix: str) -> str:
+        return f"{self.name}_{'_'.join(columns)}_{suffix}"
+
+    def allows(self, role: str, command: str) -> bool:
+        """Whether RLS lets role run command; permissive policies are OR'd together"""
+        if role == 'service_role' or not self.rls_enabled:
+            return True
+        return any(
+            cmd in (command, 'ALL') and (required is None or required == role)
+            for cmd, required in self.policies
+        )
+
+
+# ---------------------------------------------------------------------------
+# Migration loading
+# ---------------------------------------------------------------------------
+
+def split_sql_statements(sql: str) -> List[str]:
+    """Split a migration into statements, respecting quotes, $$ bodies and comments"""
+    statements, current = [], []
+    i, quoted, dollar = 0, False, False
+    while i < len(sql):
+        if not quoted and not dollar and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end
+            continue
+        if not quoted and sql.startswith('$$', i):
+            dollar = not dollar
+            current.append('$$')
+            i += 2
+            continue
+        char = sql[i]
+        if char == "'" and not dollar:
+            quoted = not quoted
+        if char == ';' and not quoted and not dollar:
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+def balanced_group(text: str, start: int) -> Tuple[str, int]:
+    """Contents of the parenthesised group opening at text[start], and the index after it"""
+    depth, quoted = 0, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+            if depth == 0:
+                return text[start + 1:i], i + 1
+    raise ValueError(f"Unbalanced parentheses in: {text[start:start + 80]}")
+
+def split_sql_list(text: str) -> List[str]:
+    """Split a SQL list on top-level commas (outside parentheses and quotes)"""
+    items, current, depth, quoted = [], '', 0, False
+    for char in text:
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char in '([':
+            depth += 1
+        elif not quoted and char in ')]':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            items.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        items.append(current.strip())
+    return items
+
+def _strip_schema(name: str) -> str:
+    name = name.strip().strip('"')
+    return name[len('public.'):] if name.lower().startswith('public.') else name
+
+def default_factory(expression: str, kind: str) -> Optional[Callable[[], Any]]:
+    """Turn a column DEFAULT expression into a callable producing the value"""
+    expr = expression.strip()
+    lowered = expr.lower()
+    if 'gen_random_uuid()' in lowered or 'uuid_generate_v4()' in lowered:
+        return lambda: str(uuid.uuid4())
+    if 'now()' in lowered or 'current_timestamp' in lowered:
+        return now_timestamp
+    if lowered == 'null':
+        return None
+    if lowered in ('true', 'false'):
+        value = lowered == 'true'
+        return lambda: value
+    literal = re.match(r"^'(.*)'(?:::[\w\[\] ]+)?$", expr, re.DOTALL)
+    if literal:
+        text = literal.group(1).replace("''", "'")
+        if kind == 'array':
+            return lambda: parse_array_literal(text)
+        if kind == 'json':
+            return lambda: json.loads(text)
+        return lambda: text
+    try:
+        number = int(expr) if re.match(r'^-?\d+$', expr) else float(expr)
+        return lambda: number
+    except ValueError:
+        return None
+
+COLUMN_CONSTRAINT_KEYWORDS = r'(?:NOT\s+NULL|NULL|DEFAULT|PRIMARY\s+KEY|UNIQUE|REFERENCES|CHECK|CONSTRAINT|GENERATED)'
+
+class MissingTable(Exception):
+    """A migration statement refers to a table no earlier migration has created"""
+
+
+class MigrationLoader:
+    """Applies the schema-defining subset of the migration SQL to a LocalDatabase"""
+
+    def __init__(self, db: 'LocalDatabase'):
+        self.db = db
+        self.deferred: List[str] = []
+
+    def load_directory(self, migrations_dir: str):
+        for filename in sorted(os.listdir(migrations_dir)):
+            if filename.endswith('.sql'):
+                with open(os.path.join(migrations_dir, filename), 'r') as f:
+                    self.apply(f.read())
+        # The migration history is not strictly ordered (20250130140000 alters
+        # tables created in 20250805020537), so statements that referenced a
+        # missing table are replayed once every table exists
+        deferred, self.deferred = self.deferred, []
+        for statement in deferred:
+            try:
+                self.apply_statement(statement)
+            except MissingTable:
+                pass
+
+    def apply(self, sql: str):
+        for statement in split_sql_statements(sql):
+            normalized = ' '.join(statement.split())
+            try:
+                self.apply_statement(normalized)
+            except MissingTable:
+                self.deferred.append(normalized)
+
+    def _table(self, name: str) -> Table:
+        table = self.db.tables.get(_strip_schema(name))
+        if table is None:
+            raise MissingTable(name)
+        return table
+
+    def apply_statement(self, normalized: str):
+        upper = normalized.upper()
+        if upper.startswith('CREATE TABLE'):
+            self._create_table(normalized)
+        elif upper.startswith('ALTER TABLE'):
+            self._alter_table(normalized)
+        elif re.match(r'^CREATE (UNIQUE )?INDEX', upper):
+            self._create_index(normalized)
+        elif upper.startswith('DROP INDEX'):
+            self._drop_index(normalized)
+        elif upper.startswith('CREATE POLICY'):
+            self._create_policy(normalized)
+        elif re.match(r'^CREATE (OR REPLACE )?TRIGGER', upper):
+            self._create_trigger(normalized)
+        elif upper.startswith('DROP TRIGGER'):
+            self._drop_trigger(normalized)
+        elif re.match(r'^CREATE (OR REPLACE )?FUNCTION', upper):
+            match = re.match(r'^CREATE (?:OR REPLACE )?FUNCTION ([\w."]+)\s*\(', normalized, re.IGNORECASE)
+            self.db.functions.add(_strip_schema(match.group(1)))
+        elif upper.startswith('DROP FUNCTION'):
+            match = re.match(r'^DROP FUNCTION (?:IF EXISTS )?([\w."]+)', normalized, re.IGNORECASE)
+            self.db.functions.discard(_strip_schema(match.group(1)))
+        elif upper.startswith('INSERT INTO STORAGE.BUCKETS'):
+            self._insert_buckets(normalized)
+        # Sample-data INSERTs, grants and comments are intentionally skipped:
+        # every run starts from an empty database with the migrated schema
+
+    def _create_table(self, statement: str):
+        match = re.match(r'^CREATE TABLE (IF NOT EXISTS )?([\w."]+)\s*\(', statement, re.IGNORECASE)
+        name = _strip_schema(match.group(2))
+        if name in self.db.tables:
+            if match.group(1):
+                return
+            raise ValueError(f"Table {name} already exists")
+        table = Table(name)
+        self.db.tables[name] = table
+        body, _ = balanced_group(statement, match.end() - 1)
+        for element in split_sql_list(body):
+            self._table_element(table, element)
+
+    def _table_element(self, table: Table, element: str):
+        upper = element.upper()
+        named = re.match(r'^CONSTRAINT ("?\w+"?) (.*)$', element, re.IGNORECASE)
+        constraint_name = named.group(1).strip('"') if named else None
+        if named:
+            element, upper = named.group(2), named.group(2).upper()
+        if upper.startswith('PRIMARY KEY'):
+            table.primary_key = tuple(c.strip().strip('"') for c in balanced_group(element, element.index('('))[0].split(','))
+        elif upper.startswith('UNIQUE'):
+            cols = tuple(c.strip().strip('"') for c in balanced_group(element, element.index('('))[0].split(','))
+            table.uniques.append((constraint_name or table.constraint_name(cols, 'key'), cols))
+        elif upper.startswith('FOREIGN KEY'):
+            self._foreign_key(table, element, constraint_name)
+        elif upper.startswith(('CHECK', 'EXCLUDE')):
+            return
+        else:
+            self._column(table, element)
+
+    def _column(self, table: Table, definition: str):
+        match = re.match(rf'^("?\w+"?)\s+(.+?)(?=\s+{COLUMN_CONSTRAINT_KEYWORDS}\b|$)(.*)$', definition, re.IGNORECASE)
+        name, sql_type, rest = match.group(1).strip('"'), match.group(2), match.group(3)
+        upper = rest.upper()
+
+        default = None
+        default_match = re.search(rf'\bDEFAULT\s+(.+?)(?=\s+{COLUMN_CONSTRAINT_KEYWORDS}\b|$)', rest, re.IGNORECASE)
+        if default_match:
+            default = default_factory(default_match.group(1), column_kind(sql_type))
+
+        primary = 'PRIMARY KEY' in upper
+        generated = bool(re.search(r'\bGENERATED\s+ALWAYS\s+AS\s*\(', rest, re.IGNORECASE))
+        column = Column(name, sql_type, nullable=not ('NOT NULL' in upper or primary), default=default,
+                        generated=generated)
+        table.columns[name] = column
+        expression = GENERATED_COLUMNS.get((table.name, name)) if generated else None
+        for row in table.rows.values():
+            row[name] = expression(row) if expression else default() if default else None
+
+        if primary:
+            table.primary_key = (name,)
+        if re.search(r'\bUNIQUE\b', upper):
+            table.uniques.append((table.constraint_name((name,), 'key'), (name,)))
+        reference = re.search(r'\bREFERENCES\s+([\w."]+)\s*\((\w+)\)(?:\s+ON DELETE (CASCADE|SET NULL|SET DEFAULT|RESTRICT|NO ACTION))?', rest, re.IGNORECASE)
+        if reference:
+            table.foreign_keys.append(ForeignKey(
+                table.constraint_name((name,), 'fkey'), table.name, (name,),
+                _strip_schema(reference.group(1)), (reference.group(2),),
+                (reference.group(3) or 'NO ACTION').upper()
+            ))
+
+    def _foreign_key(self, table: Table, element: str, constraint_name: Optional[str]):
+        match = re.match(
+            r'^FOREIGN KEY\s*\(([^)]+)\)\s*REFERENCES\s+([\w."]+)\s*\(([^)]+)\)(?:\s+ON DELETE (CASCADE|SET NULL|SET DEFAULT|RESTRICT|NO ACTION))?',
+            element, re.IGNORECASE
+        )
+        cols = tuple(c.strip().strip('"') for c in match.group(1).split(','))
+        table.foreign_keys.append(ForeignKey(
+            constraint_name or table.constraint_name(cols, 'fkey'), table.name, cols,
+            _strip_schema(match.group(2)), tuple(c.strip().strip('"') for c in match.group(3).split(',')),
+            (match.group(4) or 'NO ACTION').upper()
+        ))
+
+    def _alter_table(self, statement: str):
+        match = re.match(r'^ALTER TABLE (?:IF EXISTS )?(?:ONLY )?([\w."]+)\s+(.*)$', statement, re.IGNORECASE)
+        table = self._table(match.group(1))
+        for action in split_sql_list(match.group(2)):
+            upper = action.upper()
+            if upper.startswith('ADD COLUMN'):
+                definition = re.sub(r'^ADD COLUMN (IF NOT EXISTS )?', '', action, flags=re.IGNORECASE)
+                column_name = definition.split()[0].strip('"')
+                if column_name not in table.columns:
+                    self._column(table, definition)
+            elif upper.startswith('ADD CONSTRAINT') or upper.startswith(('ADD FOREIGN KEY', 'ADD UNIQUE', 'ADD PRIMARY KEY')):
+                self._table_element(table, re.sub(r'^ADD ', '', action, flags=re.IGNORECASE))
+            elif upper.startswith('DROP COLUMN'):
+                column_name = re.sub(r'^DROP COLUMN (IF EXISTS )?', '', action, flags=re.IGNORECASE).split()[0].strip('"')
+                table.columns.pop(column_name, None)
+                for row in table.rows.values():
+                    row.pop(column_name, None)
+            elif upper == 'ENABLE ROW LEVEL SECURITY':
+                table.rls_enabled = True
+            elif upper == 'DISABLE ROW LEVEL SECURITY':
+                table.rls_enabled = False
+        table.build_indexes()
+
+    def _create_index(self, statement: str):
+        match = re.match(
+            r'^CREATE (UNIQUE )?INDEX (?:CONCURRENTLY )?(?:IF NOT EXISTS )?("?\w+"?)\s+ON\s+(?:ONLY )?([\w."]+)(?:\s+USING\s+(\w+))?\s*\(',
+            statement, re.IGNORECASE
+        )
+        table = self._table(match.group(3))
+        name = match.group(2).strip('"')
+        if any(index.name == name for index in table.indexes):
+            return
+        body, end = balanced_group(statement, match.end() - 1)
+        columns = []
+        for item in split_sql_list(body):
+            desc = bool(re.search(r'\bDESC\b', item, re.IGNORECASE))
+            expr = re.sub(r'\s+(ASC|DESC)(\s+NULLS\s+(FIRST|LAST))?$', '', item, flags=re.IGNORECASE).strip().strip('"')
+            columns.append((expr, desc))
+        rest = statement[end:].strip()
+        where = re.match(r'^WHERE\s+(.*)$', rest, re.IGNORECASE)
+        index = Index(name, table.name, columns, (match.group(4) or 'btree').lower(),
+                      where.group(1) if where else None, bool(match.group(1)))
+        table.indexes.append(index)
+        if index.unique and index.where is None and all(col in table.columns for col, _ in columns):
+            table.uniques.append((name, tuple(col for col, _ in columns)))
+        table.build_indexes()
+
+    def _drop_index(self, statement: str):
+        match = re.match(r'^DROP INDEX (?:CONCURRENTLY )?(?:IF EXISTS )?([\w."]+)', statement, re.IGNORECASE)
+        name = _strip_schema(match.group(1))
+        for table in self.db.tables.values():
+            table.indexes = [index for index in table.indexes if index.name != name]
+            table.uniques = [u for u in table.uniques if u[0] != name]
+            table.build_indexes()
+
+    def _create_policy(self, statement: str):
+        match = re.match(r'^CREATE POLICY\s+(".*?"|\w+)\s+ON\s+([\w."]+)(.*)$', statement, re.IGNORECASE)
+        if match is None:
+            return
+        rest = match.group(3)
+        command = re.search(r'\bFOR\s+(ALL|SELECT|INSERT|UPDATE|DELETE)\b', rest, re.IGNORECASE)
+        command = command.group(1).upper() if command else 'ALL'
+        # Policies that check auth.role()/auth.uid() or target a role only admit
+        # signed-in users; any other USING/WITH CHECK expression is treated as public
+        required = None
+        if re.search(r"auth\.role\(\)\s*=\s*'authenticated'|auth\.uid\(\)|\bTO\s+authenticated\b", rest, re.IGNORECASE):
+            required = 'authenticated'
+        if match.group(2).lower() == 'storage.objects':
+            bucket = re.search(r"bucket_id\s*=\s*'([^']*)'", rest)
+            self.db.storage.policies.append((command, bucket.group(1) if bucket else None, required))
+            return
+        if match.group(2).lower().startswith('storage.'):
+            return
+        table = self._table(match.group(2))
+        table.policies.append((command, required))
+
+    def _insert_buckets(self, statement: str):
+        match = re.match(r'^INSERT INTO storage\.buckets\s*\(([^)]*)\)\s*VALUES\s*', statement, re.IGNORECASE)
+        columns = [column.strip() for column in match.group(1).split(',')]
+        position = match.end()
+        while position < len(statement) and statement[position] == '(':
+            values, position = balanced_group(statement, position)
+            bucket = dict(zip(columns, (parse_sql_literal(value) for value in split_sql_list(values))))
+            # ON CONFLICT (id) DO UPDATE replaces the whole configuration
+            self.db.storage.buckets[bucket['id']] = bucket
+            rest = statement[position:].lstrip()
+            if not rest.startswith(','):
+                break
+            position = len(statement) - len(rest[1:].lstrip())
+
+    def _create_trigger(self, statement: str):
+        match = re.match(
+            r'^CREATE (?:OR REPLACE )?TRIGGER (\w+)\s+(BEFORE|AFTER)\s+(.+?)\s+ON\s+([\w."]+)\s+FOR EACH ROW\s+EXECUTE (?:FUNCTION|PROCEDURE)\s+([\w."]+)\s*\(',
+            statement, re.IGNORECASE
+        )
+        if match is None:
+            return
+        table = self._table(match.group(4))
+        events = {event.split()[0].upper() for event in re.split(r'\s+OR\s+', match.group(3), flags=re.IGNORECASE)}
+        table.triggers = [t for t in table.triggers if t.name != match.group(1)]
+        table.triggers.append(Trigger(match.group(1), table.name, match.group(2).upper(), events,
+                                      _strip_schema(match.group(5))))
+        # PostgreSQL fires same-timing row triggers in alphabetical order of name
+        table.triggers.sort(key=lambda t: t.name)
+
+    def _drop_trigger(self, statement: str):
+        match = re.match(r'^DROP TRIGGER (?:IF EXISTS )?(\w+)\s+ON\s+([\w."]+)', statement, re.IGNORECASE)
+        table = self.db.tables.get(_strip_schema(match.group(2))) if match else None
+        if table is not None:
+            table.triggers = [t for t in table.triggers if t.name != match.group(1)]
+
+
+# ---------------------------------------------------------------------------
+# Query representation
+# ---------------------------------------------------------------------------
+
+class Condition:
+    def __init__(self, column: str, operator: str, value: str, negate: bool = False):
+        self.column = column
+        self.operator = operator
+        self.value = value
+        self.negate = negate
+        self._coerced: Dict[Any, Any] = {}
+
+    def operand(self, kind: Optional[str], sample: Any = None) -> Any:
+        """The filter value coerced for comparison, parsed once per column kind"""
+        cache_key = kind or type(sample)
+        if cache_key not in self._coerced:
+            if self.operator == 'in':
+                raw = self.value.strip()
+                items = split_top_level(raw[1:-1]) if raw != '()' else []
+                self._coerced[cache_key] = {coerce_filter_value(item, kind, sample) for item in items}
+            elif self.operator in ('cs', 'cd', 'ov'):
+                self._coerced[cache_key] = set(parse_array_literal(self.value))
+            else:
+                self._coerced[cache_key] = coerce_filter_value(self.value, kind, sample)
+        return self._coerced[cache_key]
+
+
+class BoolNode:
+    def __init__(self, kind: str, children: List[Any], negate: bool = False):
+        self.kind = kind
+        self.children = children
+        self.negate = negate
+
+
+class SelectItem:
+    def __init__(self, kind: str, name: str = '*', alias: Optional[str] = None,
+                 hint: Optional[str] = None, inner: bool = False,
+                 children: Optional[List['SelectItem']] = None):
+        self.kind = kind
+        self.name = name
+        self.alias = alias or name
+        self.hint = hint
+        self.inner = inner
+        self.children = children or []
+
+
+def parse_condition(column: str, expression: str) -> Condition:
+    """Parse `op.value` / `not.op.value` from a filter parameter"""
+    negate = False
+    if expression.startswith('not.'):
+        negate, expression = True, expression[4:]
+    operator, _, value = expression.partition('.')
+    if operator.endswith(')') and '(' in operator:
+        # fts(config) variants
+        operator = operator[:operator.index('(')]
+    if operator not in ('in', 'cs', 'cd', 'ov') and len(value) >= 2 and value[0] == value[-1] == '"':
+        # Clients quote values containing reserved characters such as ':' in timestamps
+        value = value[1:-1].replace('\\"', '"')
+    return Condition(column, operator, value, negate)
+
+def parse_logic_tree(kind: str, text: str, negate: bool = False) -> BoolNode:
+    """Parse the body of or=(...) / and=(...) into a BoolNode"""
+    inner = text.strip()
+    if inner.startswith('(') and inner.endswith(')'):
+        inner = inner[1:-1]
+    children = []
+    for part in _split_logic(inner):
+        match = re.match(r'^(not\.)?(and|or)\((.*)\)$', part, re.DOTALL)
+        if match:
+            children.append(parse_logic_tree(match.group(2), f"({match.group(3)})", bool(match.group(1))))
+        else:
+            column, _, expression = part.partition('.')
+            children.append(parse_condition(column, expression))
+    return BoolNode(kind, children, negate)
+
+def _split_logic(text: str) -> List[str]:
+    items, current, depth, quoted = [], '', 0, False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            items.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        items.append(current.strip())
+    return items
+
+def parse_select(text: str) -> List[SelectItem]:
+    """Parse a PostgREST select parameter, including embedded resources"""
+    items = []
+    for part in _split_logic(text or '*'):
+        if not part:
+            continue
+        embed = re.match(r'^(?:(\w+):)?([\w]+)(?:!(\w+))?(?:!(\w+))?\((.*)\)$', part, re.DOTALL)
+        if embed:
+            alias, name, first, second, body = embed.groups()
+            flags = [flag for flag in (first, second) if flag]
+            inner = 'inner' in flags
+            hint = next((flag for flag in flags if flag not in ('inner', 'left')), None)
+            items.append(SelectItem('embed', name, alias, hint, inner, parse_select(body)))
+        elif part == '*':
+            items.append(SelectItem('star'))
+        else:
+            match = re.match(r'^(?:(\w+):)?([\w]+)(?:::(\w+))?$', part)
+            if not match:
+                raise PostgrestError(400, 'PGRST100', f'"failed to parse select parameter ({part})"')
+            items.append(SelectItem('column', match.group(2), match.group(1)))
+    return items
+
+def like_to_regex(pattern: str) -> 're.Pattern':
+    regex = ''
+    for char in pattern:
+        if char in '%*':
+            regex += '.*'
+        elif char == '_':
+            regex += '.'
+        else:
+            regex += re.escape(char)
+    return re.compile(f'^{regex}$', re.DOTALL)
+
+PLAN_OPERATORS = {'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+                  'like': '~~', 'ilike': '~~*', 'match': '~', 'imatch': '~*',
+                  'cs': '@>', 'cd': '<@', 'ov': '&&', 'is': 'IS'}
+
+def plan_condition_text(node: Any) -> str:
+    """A filter tree rendered the way EXPLAIN prints Filter/Index Cond"""
+    if isinstance(node, BoolNode):
+        text = '(' + f" {node.kind.upper()} ".join(plan_condition_text(child) for child in node.children) + ')'
+    elif node.operator == 'in':
+        text = f"({node.column} = ANY ('{{{node.value.strip()[1:-1]}}}'))"
+    elif node.operator == 'is':
+        text = f"({node.column} IS {node.value.upper()})"
+    else:
+        text = f"({node.column} {PLAN_OPERATORS.get(node.operator, node.operator)} '{node.value}')"
+    return f"(NOT {text})" if node.negate else text
+
+
+class Relationship:
+    """How an embedded resource joins to its parent"""
+
+    def __init__(self, kind: str, target: str, parent_columns: Tuple[str, ...],
+                 target_columns: Tuple[str, ...], junction: Optional[str] = None,
+                 junction_parent: Tuple[str, ...] = (), junction_target: Tuple[str, ...] = ()):
+        self.kind = kind
+        self.target = target
+        self.parent_columns = parent_columns
+        self.target_columns = target_columns
+        self.junction = junction
+        self.junction_parent = junction_parent
+        self.junction_target = junction_target
+
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+
+class LocalDatabase:
+    """In-memory tables with PostgreSQL-like constraint, trigger and RLS behaviour.
+
+    All statements run under one lock; a statement that fails part way is rolled
+    back through an undo log, so each request is atomic like a PostgREST call.
+    """
+
+    def __init__(self, migrations_dir: str = MIGRATIONS_DIR):
+        self.tables: Dict[str, Table] = {}
+        self.functions: Set[str] = set()
+        self.storage = LocalStorage()
+        self.lock = threading.RLock()
+        self._undo: Optional[List[Tuple]] = None
+        if migrations_dir:
+            MigrationLoader(self).load_directory(migrations_dir)
+        self._referencing = self._referencing_map()
+
+    def apply_sql(self, sql: str):
+        """Apply additional schema SQL (e.g. a migration under test)"""
+        with self.lock:
+            MigrationLoader(self).apply(sql)
+            self._referencing = self._referencing_map()
+
+    def _referencing_map(self) -> Dict[str, List[ForeignKey]]:
+        referencing: Dict[str, List[ForeignKey]] = {}
+        for table in self.tables.values():
+            for fk in table.foreign_keys:
+                referencing.setdefault(fk.ref_table, []).append(fk)
+        return referencing
+
+    def table(self, name: str) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            raise PostgrestError(404, 'PGRST205', f"Could not find the table 'public.{name}' in the schema cache")
+        return table
+
+    # -- transactions ------------------------------------------------------
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            if self._undo is not None:
+                yield
+                return
+            self._undo = []
+            _transaction_clock.now = canonical_timestamp(datetime.now(timezone.utc))
+            try:
+                yield
+            except Exception:
+                self._rollback()
+                raise
+            finally:
+                self._undo = None
+                _transaction_clock.now = None
+
+    def _rollback(self):
+        for entry in reversed(self._undo):
+            action, table, key = entry[0], entry[1], entry[2]
+            if action == 'insert':
+                table.index_remove(key, table.rows.pop(key))
+            elif action == 'delete':
+                table.rows[key] = entry[3]
+                table.index_add(key, entry[3])
+            elif action == 'update':
+                old_row, new_key = entry[3], entry[4]
+                table.index_remove(new_key, table.rows.pop(new_key))
+                table.rows[key] = old_row
+                table.index_add(key, old_row)
+
+    # -- row primitives -----------------------------------------------------
+
+    def _fire(self, table: Table, timing: str, event: str,
+              new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        for trigger in table.triggers:
+            if trigger.timing != timing or event not in trigger.events:
+                continue
+            func = TRIGGER_FUNCTIONS.get(trigger.function)
+            if func is None or trigger.function not in self.functions:
+                continue
+            result = func(self, event, new, old, table.name)
+            if timing == 'BEFORE' and result is not None:
+                new = result
+        return new
+
+    def _check_row(self, table: Table, row: Dict[str, Any], own_key: Optional[Tuple]):
+        for column in table.columns.values():
+            if not column.nullable and row.get(column.name) is None:
+                raise PostgrestError(
+                    400, '23502',
+                    f'null value in column "{column.name}" of relation "{table.name}" violates not-null constraint'
+                )
+        for cols, mapping in table.unique_maps.items():
+            values = tuple(row[c] for c in cols)
+            existing = mapping.get(values)
+            if None not in values and existing is not None and existing != own_key:
+                name = f"{table.name}_pkey" if cols == table.primary_key else next(
+                    (n for n, c in table.uniques if c == cols), table.constraint_name(cols, 'key'))
+                raise PostgrestError(
+                    409, '23505', f'duplicate key value violates unique constraint "{name}"',
+                    f"Key ({', '.join(cols)})=({', '.join(str(v) for v in values)}) already exists."
+                )
+        for fk in table.foreign_keys:
+            values = tuple(row[c] for c in fk.columns)
+            if None in values:
+                continue
+            if not self.table(fk.ref_table).lookup(fk.ref_columns, values):
+                raise PostgrestError(
+                    409, '23503',
+                    f'insert or update on table "{table.name}" violates foreign key constraint "{fk.name}"',
+                    f"Key ({', '.join(fk.columns)})=({', '.join(str(v) for v in values)}) "
+                    f'is not present in table "{fk.ref_table}".'
+                )
+
+    def _store(self, table: Table, key: Tuple, row: Dict[str, Any]):
+        table.rows[key] = row
+        table.index_add(key, row)
+        if self._undo is not None:
+            self._undo.append(('insert', table, key))
+
+    def build_row(self, table: Table, values: Dict[str, Any],
+                  null_columns: Iterable[str] = ()) -> Dict[str, Any]:
+        """Complete a row from provided values, NULLs for null_columns and column defaults"""
+        for name in values:
+            if name not in table.columns:
+                raise PostgrestError(400, 'PGRST204', f"Could not find the '{name}' column of '{table.name}' in the schema cache")
+        for name in values:
+            if table.columns[name].generated:
+                raise PostgrestError(400, '428C9', f'cannot insert a non-DEFAULT value into column "{name}"',
+                                     f'Column "{name}" is a generated column.')
+        null_columns = set(null_columns)
+        row = {}
+        for name, column in table.columns.items():
+            if name in values:
+                row[name] = normalize_value(table, column, values[name])
+            elif name in null_columns or column.default is None:
+                row[name] = None
+            else:
+                row[name] = column.default()
+        return row
+
+    def compute_generated(self, table: Table, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill generated columns; like PostgreSQL this runs after BEFORE triggers"""
+        for name, column in table.columns.items():
+            if column.generated:
+                expression = GENERATED_COLUMNS.get((table.name, name))
+                row[name] = expression(row) if expression else None
+        return row
+
+    def insert_row(self, table: Table, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = self.compute_generated(table, self._fire(table, 'BEFORE', 'INSERT', row, None))
+        self._check_row(table, row, None)
+        self._store(table, table.key_of(row), row)
+        self._fire(table, 'AFTER', 'INSERT', row, None)
+        return row
+
+    def update_row(self, table: Table, key: Tuple, changes: Dict[str, Any]) -> Dict[str, Any]:
+        old = table.rows[key]
+        new = dict(old)
+        for name, value in changes.items():
+            if name not in table.columns:
+                raise PostgrestError(400, 'PGRST204', f"Could not find the '{name}' column of '{table.name}' in the schema cache")
+            if table.columns[name].generated:
+                raise PostgrestError(400, '428C9', f'column "{name}" can only be updated to DEFAULT',
+                                     f'Column "{name}" is a generated column.')
+            new[name] = normalize_value(table, table.columns[name], value)
+        new = self.compute_generated(table, self._fire(table, 'BEFORE', 'UPDATE', new, old))
+        self._check_row(table, new, key)
+        new_key = table.key_of(new)
+        table.index_remove(key, table.rows.pop(key))
+        table.rows[new_key] = new
+        table.index_add(new_key, new)
+        if self._undo is not None:
+            self._undo.append(('update', table, key, old, new_key))
+        self._fire(table, 'AFTER', 'UPDATE', new, old)
+        return new
+
+    def delete_row(self, table: Table, key: Tuple) -> Optional[Dict[str, Any]]:
+        row = table.rows.get(key)
+        if row is None:
+            return None
+        self._fire(table, 'BEFORE', 'DELETE', None, row)
+        table.index_remove(key, table.rows.pop(key))
+        if self._undo is not None:
+            self._undo.append(('delete', table, key, row))
+        # Referential actions run before NO ACTION/RESTRICT checks, so a column
+        # covered by both a SET NULL and a NO ACTION constraint is released first
+        referencing = sorted(self._referencing.get(table.name, []),
+                             key=lambda fk: fk.on_delete not in ('CASCADE', 'SET NULL'))
+        for fk in referencing:
+            child = self.tables[fk.table]
+            values = tuple(row[c] for c in fk.ref_columns)
+            for child_key in child.lookup(fk.columns, values):
+                if child_key not in child.rows:
+                    continue
+                if fk.on_delete == 'CASCADE':
+                    self.delete_row(child, child_key)
+                elif fk.on_delete == 'SET NULL':
+                    self.update_row(child, child_key, {c: None for c in fk.columns})
+                else:
+                    raise PostgrestError(
+                        409, '23503',
+                        f'update or delete on table "{table.name}" violates foreign key constraint '
+                        f'"{fk.name}" on table "{fk.table}"',
+                        f"Key ({', '.join(fk.ref_columns)})=({', '.join(str(v) for v in values)}) "
+                        f'is still referenced from table "{fk.table}".'
+                    )
+        self._fire(table, 'AFTER', 'DELETE', None, row)
+        return row
+
+    # -- filtering ----------------------------------------------------------
+
+    def evaluate(self, node: Any, row: Dict[str, Any], table: Optional[Table]) -> Optional[bool]:
+        """Three-valued evaluation of a filter tree against a row (None is SQL NULL)"""
+        if isinstance(node, BoolNode):
+            results = [self.evaluate(child, row, table) for child in node.children]
+            if node.kind == 'and':
+                result = False if False in results else None if None in results else True
+            else:
+                result = True if True in results else None if None in results else False
+        else:
+            result = self._compare(node, row, table)
+        if node.negate and result is not None:
+            return not result
+        return result
+
+    def _compare(self, condition: Condition, row: Dict[str, Any], table: Optional[Table]) -> Optional[bool]:
+        if condition.column not in row:
+            raise PostgrestError(400, '42703', f"column {table.name if table else 'result'}.{condition.column} does not exist")
+        value = row[condition.column]
+        column = table.columns.get(condition.column) if table else None
+        kind = column.kind if column else None
+        operator, raw = condition.operator, condition.value
+
+        if operator == 'is':
+            lowered = raw.lower()
+            if lowered == 'null':
+                return value is None
+            if lowered in ('true', 'false'):
+                return value is (lowered == 'true')
+            if lowered == 'unknown':
+                return value is None
+            raise PostgrestError(400, 'PGRST100', f'"failed to parse filter (is.{raw})"')
+        if value is None:
+            return None
+        if operator == 'in':
+            return value in condition.operand(kind, value)
+        if operator in ('eq', 'neq', 'gt', 'gte', 'lt', 'lte'):
+            target = condition.operand(kind, value)
+            if operator == 'eq':
+                return value == target
+            if operator == 'neq':
+                return value != target
+            if operator == 'gt':
+                return value > target
+            if operator == 'gte':
+                return value >= target
+            if operator == 'lt':
+                return value < target
+            return value <= target
+        if operator in ('like', 'ilike'):
+            flags = like_to_regex(raw.lower() if operator == 'ilike' else raw)
+            return bool(flags.match(str(value).lower() if operator == 'ilike' else str(value)))
+        if operator in ('match', 'imatch'):
+            return bool(re.search(raw, str(value), re.IGNORECASE if operator == 'imatch' else 0))
+        if operator in ('cs', 'cd', 'ov'):
+            wanted = condition.operand(kind, value)
+            have = set(str(item) for item in value)
+            if operator == 'cs':
+                return wanted <= have
+            if operator == 'cd':
+                return have <= wanted
+            return bool(wanted & have)
+        raise PostgrestError(400, 'PGRST100', f'"unsupported operator in local stand-in ({operator})"')
+
+    def candidate_keys(self, table: Table, filters: List[Any]) -> Iterable[Tuple]:
+        """Narrow the scan with a hash index when a top-level eq/in filter allows it"""
+        for node in filters:
+            if (isinstance(node, Condition) and not node.negate and node.operator in ('eq', 'in')
+                    and node.column in table.hash_indexes):
+                operand = node.operand(table.columns[node.column].kind)
+                values = operand if node.operator == 'in' else [operand]
+                index = table.hash_indexes[node.column]
+                keys = []
+                for value in values:
+                    keys.extend(index.get(value, ()))
+                # Keep storage order, as a sequential scan would
+                wanted = set(keys)
+                return [k for k in table.rows if k in wanted]
+        return list(table.rows)
+
+    def filter_rows(self, table: Table, filters: List[Any]) -> List[Tuple]:
+        return [
+            key for key in self.candidate_keys(table, filters)
+            if all(self.evaluate(node, table.rows[key], table) is True for node in filters)
+        ]
+
+    # -- ordering and projection -------------------------------------------
+
+    @staticmethod
+    def order_rows(rows: List[Dict[str, Any]], order: List[Tuple[str, bool, Optional[bool]]]) -> List[Dict[str, Any]]:
+        for column, desc, nullsfirst in reversed(order):
+            if nullsfirst is None:
+                nullsfirst = desc
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present = sorted(present, key=lambda row: row[column], reverse=desc)
+            rows = missing + present if nullsfirst else present + missing
+        return rows
+
+    # -- query plans ---------------------------------------------------------
+
+    @staticmethod
+    def plan_indexes(table: Table) -> List[Index]:
+        """Btree indexes a read can use, including the ones behind primary and unique keys"""
+        indexes = []
+        if table.primary_key:
+            indexes.append(Index(f"{table.name}_pkey", table.name,
+                                 [(col, False) for col in table.primary_key], unique=True))
+        declared = {index.name for index in table.indexes}
+        indexes.extend(Index(name, table.name, [(col, False) for col in cols], unique=True)
+                       for name, cols in table.uniques if name not in declared)
+        indexes.extend(index for index in table.indexes
+                       if index.method == 'btree' and all(col in table.columns for col, _ in index.columns))
+        return indexes
+
+    @staticmethod
+    def _implied_predicate(index: Index, equalities: Dict[str, Condition]) -> Optional[List[Condition]]:
+        """Filters implying a partial index's WHERE clause (`col = literal` conjuncts only), or None"""
+        if not index.where:
+            return []
+        implied = []
+        for conjunct in re.split(r'\s+AND\s+', index.where.strip(), flags=re.IGNORECASE):
+            match = re.match(r"^\(*\s*\"?(\w+)\"?\s*(?:=|IS)\s*'?([^'\s)]+)'?\s*\)*$", conjunct.strip(), re.IGNORECASE)
+            condition = equalities.get(match.group(1)) if match else None
+            if condition is None or condition.value.lower() != match.group(2).lower():
+                return None
+            implied.append(condition)
+        return implied
+
+    def explain(self, table: Table, filters: List[Any], order: List[Tuple[str, bool, Optional[bool]]],
+                limit: Optional[int] = None, offset: int = 0, analyze: bool = False,
+                visible: bool = True) -> List[Dict[str, Any]]:
+        """EXPLAIN (FORMAT JSON) for a read of one table, run as well with analyze.
+
+        The planner weighs a sequential scan against each usable btree index with a
+        crude cost model (an index visit costs four sequential row reads) and exact
+        statistics; embedded resources are left out of the plan.
+        """
+        started = time.perf_counter()
+        keys = list(table.rows) if visible else []
+        wanted = None if limit is None else offset + limit
+        equalities = {node.column: node for node in filters
+                      if isinstance(node, Condition) and not node.negate and node.operator in ('eq', 'is')}
+        indexable = {node.column: node for node in filters
+                     if isinstance(node, Condition) and not node.negate and node.operator in ('eq', 'in')}
+
+        def passes(key: Tuple, conditions: List[Any]) -> bool:
+            return all(self.evaluate(node, table.rows[key], table) is True for node in conditions)
+
+        def scan(candidates: List[Tuple], stop_early: bool) -> Tuple[int, int]:
+            visited = produced = 0
+            for key in candidates:
+                visited += 1
+                if passes(key, filters):
+                    produced += 1
+                    if stop_early and produced >= wanted:
+                        break
+            return visited, produced
+
+        visited, produced = scan(keys, not order and wanted is not None)
+        best = {'cost': float(visited), 'visited': visited, 'produced': produced, 'index': None, 'sorted': False}
+        for index in self.plan_indexes(table):
+            implied = self._implied_predicate(index, equalities)
+            if implied is None:
+                continue
+            conds = []
+            for col, _ in index.columns:
+                if col not in indexable:
+                    break
+                conds.append(indexable[col])
+            rest = index.columns[len(conds):]
+            flips = {desc != index_desc for (col, index_desc), (name, desc, _) in zip(rest, order) if col == name}
+            in_order = (bool(order) and len(rest) >= len(order) and len(flips) == 1
+                        and all(col == name for (col, _), (name, _, _) in zip(rest, order))
+                        and all(cond.operator == 'eq' for cond in conds))
+            if not conds and not (in_order and wanted is not None):
+                continue
+            candidates = [key for key in keys if passes(key, conds + implied)]
+            if in_order:
+                by_row = {id(table.rows[key]): key for key in candidates}
+                candidates = [by_row[id(row)] for row in self.order_rows([table.rows[key] for key in candidates], order)]
+            visited, produced = scan(candidates, in_order and wanted is not None)
+            cost = 4.0 * visited + 4.0
+            if cost < best['cost']:
+                best = {'cost': cost, 'visited': visited, 'produced': produced, 'index': index,
+                        'sorted': in_order, 'conds': conds, 'implied': implied,
+                        'backward': in_order and flips == {True}}
+
+        def node(node_type: str, rows: int, **fields: Any) -> Dict[str, Any]:
+            plan = {'Node Type': node_type, 'Parallel Aware': False, 'Plan Rows': rows, **fields}
+            if analyze:
+                plan.update({'Actual Rows': rows, 'Actual Loops': 1})
+            return plan
+
+        index = best['index']
+        # Conditions the index applies, or its partial predicate already guarantees, are not rechecked
+        residual = [cond for cond in filters if index is None or cond not in best['conds'] + best['implied']]
+        fields: Dict[str, Any] = {'Relation Name': table.name, 'Schema': 'public', 'Alias': table.name}
+        if index is not None:
+            fields.update({'Scan Direction': 'Backward' if best['backward'] else 'Forward', 'Index Name': index.name})
+            if best['conds']:
+                fields['Index Cond'] = ' AND '.join(plan_condition_text(cond) for cond in best['conds'])
+        if residual:
+            fields['Filter'] = ' AND '.join(plan_condition_text(cond) for cond in residual)
+        plan = node('Index Scan' if index is not None else 'Seq Scan', best['produced'], **fields)
+        if residual and analyze:
+            plan['Rows Removed by Filter'] = best['visited'] - best['produced']
+        if order and not best['sorted']:
+            keys_text = [f"{name}{' DESC' if desc else ''}" for name, desc, _ in order]
+            plan = node('Sort', best['produced'], **{'Sort Key': keys_text, 'Plans': [plan]})
+            if analyze:
+                plan['Sort Method'] = 'top-N heapsort' if wanted is not None else 'quicksort'
+        if wanted is not None:
+            plan = node('Limit', max(min(best['produced'], wanted) - offset, 0), Plans=[plan])
+        # PostgREST wraps every read in an aggregate that builds the JSON body
+        plan = node('Aggregate', 1, Strategy='Plain', Plans=[plan])
+        result: Dict[str, Any] = {'Plan': plan}
+        if analyze:
+            result.update({'Planning Time': 0.0, 'Execution Time': round((time.perf_counter() - started) * 1000, 3)})
+        return [result]
+
+    def relationship(self, parent: Table, name: str, hint: Optional[str]) -> Relationship:
+        """Resolve an embedded resource the way PostgREST does from foreign keys"""
+        target = self.table(name)
+        candidates = []
+        for fk in parent.foreign_keys:
+            if fk.ref_table == target.name and (hint is None or hint in (fk.name, fk.columns[0])):
+                candidates.append(Relationship('m2o', target.name, fk.columns, fk.ref_columns))
+        for fk in target.foreign_keys:
+            if fk.ref_table == parent.name and (hint is None or hint in (fk.name, fk.columns[0])):
+                candidates.append(Relationship('o2m', target.name, fk.ref_columns, fk.columns))
+        if not candidates:
+            for junction in self.tables.values():
+                to_parent = [fk for fk in junction.foreign_keys if fk.ref_table == parent.name]
+                to_target = [fk for fk in junction.foreign_keys if fk.ref_table == target.name]
+                if to_parent and to_target and (hint is None or hint == junction.name):
+                    candidates.append(Relationship(
+                        'm2m', target.name, to_parent[0].ref_columns, to_target[0].ref_columns,
+                        junction.name, to_parent[0].columns, to_target[0].columns
+                    ))
+        # Several constraints on the same columns describe one relationship
+        unique = {(c.kind, c.parent_columns, c.target_columns, c.junction): c for c in candidates}
+        if not unique:
+            raise PostgrestError(
+                400, 'PGRST200',
+                f"Could not find a relationship between '{parent.name}' and '{name}' in the schema cache"
+            )
+        if len(unique) > 1:
+            raise PostgrestError(
+                300, 'PGRST201',
+                f"Could not embed because more than one relationship was found for '{parent.name}' and '{name}'"
+            )
+        return next(iter(unique.values()))
+
+    def project(self, table: Table, rows: List[Dict[str, Any]], items: List[SelectItem],
+                embed_options: Dict[str, Dict[str, Any]], path: str = '') -> List[Dict[str, Any]]:
+        """Apply a parsed select list to rows, resolving embedded resources"""
+        for item in items:
+            # PostgREST rejects an unknown column even when no row matches
+            if item.kind == 'column' and item.name not in table.columns:
+                raise PostgrestError(400, '42703', f"column {table.name}.{item.name} does not exist")
+        output = []
+        for row in rows:
+            result, keep = {}, True
+            for item in items:
+                if item.kind == 'star':
+                    result.update(row)
+                elif item.kind == 'column':
+                    if item.name not in row:
+                        raise PostgrestError(400, '42703', f"column {table.name}.{item.name} does not exist")
+                    result[item.alias] = row[item.name]
+                else:
+                    value = self._embed(table, row, item, embed_options, f"{path}{item.alias}")
+                    if item.inner and not value:
+                        keep = False
+                        break
+                    result[item.alias] = value
+            if keep:
+                output.append(result)
+        return output
+
+    def _embed(self, parent: Table, row: Dict[str, Any], item: SelectItem,
+               embed_options: Dict[str, Dict[str, Any]], path: str) -> Any:
+        relation = self.relationship(parent, item.name, item.hint)
+        target = self.tables[relation.target]
+        values = tuple(row[c] for c in relation.parent_columns)
+        if None in values:
+            keys = []
+        elif relation.kind == 'm2m':
+            junction = self.tables[relation.junction]
+            keys = []
+            for junction_key in junction.lookup(relation.junction_parent, values):
+                linked = tuple(junction.rows[junction_key][c] for c in relation.junction_target)
+                keys.extend(target.lookup(relation.target_columns, linked))
+        else:
+            keys = target.lookup(relation.target_columns, values)
+
+        options = embed_options.get(path, {})
+        related = [target.rows[key] for key in keys]
+        if options.get('filters'):
+            related = [r for r in related if all(self.evaluate(n, r, target) is True for n in options['filters'])]
+        if relation.kind == 'm2o':
+            projected = self.project(target, related[:1], item.children, embed_options, f"{path}.")
+            return projected[0] if projected else None
+        if options.get('order'):
+            related = self.order_rows(related, options['order'])
+        offset = options.get('offset', 0)
+        limit = options.get('limit')
+        related = related[offset:offset + limit if limit is not None else None]
+        return self.project(target, related, item.children, embed_options, f"{path}.")
+
+
+# ---------------------------------------------------------------------------
+# SQL function equivalents
+# ---------------------------------------------------------------------------
+
+@trigger_function('update_updated_at_column')
+def _update_updated_at_column(db: LocalDatabase, op: str, new: Dict[str, Any], old: Optional[Dict[str, Any]], table: str):
+    new['updated_at'] = now_timestamp()
+    return new
+
+def generate_slug(text: str) -> str:
+    """lower(regexp_replace(trim(input_text), '[^a-zA-Z0-9]+', '-', 'g'))"""
+    return re.sub(r'[^a-zA-Z0-9]+', '-', text.strip(' ')).lower()
+
+@rpc_function('generate_slug')
+def _generate_slug_rpc(db: LocalDatabase, role: str, input_text: str) -> str:
+    return generate_slug(input_text)
+
+@trigger_function('auto_generate_tag_slug')
+def _auto_generate_tag_slug(db: LocalDatabase, op: str, new: Dict[str, Any], old: Optional[Dict[str, Any]], table: str):
+    if not new.get('slug'):
+        new['slug'] = generate_slug(new['name'])
+    new['updated_at'] = now_timestamp()
+    return new
+
+def _adjust_count(db: LocalDatabase, table: str, row_id: Any, delta: int):
+    """UPDATE table SET article_count = article_count + 1 / GREATEST(article_count - 1, 0)"""
+    target = db.tables[table]
+    for key in target.lookup(('id',), (row_id,)):
+        count = target.rows[key]['article_count']
+        if delta > 0:
+            value = None if count is None else count + 1
+        else:
+            # GREATEST ignores NULL arguments
+            value = 0 if count is None else max(count - 1, 0)
+        db.update_row(target, key, {'article_count': value})
+
+def _article_count_trigger(column: str, counted_table: str):
+    def trigger(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+        if op == 'INSERT':
+            if new[column] is not None and new['published'] is True:
+                _adjust_count(db, counted_table, new[column], 1)
+        elif op == 'UPDATE':
+            if old[column] != new[column]:
+                if old[column] is not None and old['published'] is True:
+                    _adjust_count(db, counted_table, old[column], -1)
+                if new[column] is not None and new['published'] is True:
+                    _adjust_count(db, counted_table, new[column], 1)
+            if old['published'] != new['published'] and new[column] is not None:
+                _adjust_count(db, counted_table, new[column], 1 if new['published'] is True else -1)
+        elif op == 'DELETE':
+            if old[column] is not None and old['published'] is True:
+                _adjust_count(db, counted_table, old[column], -1)
+    return trigger
+
+TRIGGER_FUNCTIONS['update_category_article_count'] = _article_count_trigger('category_id', 'categories')
+TRIGGER_FUNCTIONS['update_series_article_count'] = _article_count_trigger('series_id', 'series')
+
+def _adjust_tag_usage(db: LocalDatabase, column: str, tag_ids: Iterable[Any], delta: int):
+    """UPDATE tags SET column = column + 1 / GREATEST(column - 1, 0) WHERE id IN tag_ids"""
+    tags = db.tables['tags']
+    for tag_id in tag_ids:
+        for key in tags.lookup(('id',), (tag_id,)):
+            count = tags.rows[key][column]
+            db.update_row(tags, key, {column: count + 1 if delta > 0 else max(count - 1, 0)})
+
+def _post_published(db: LocalDatabase, blog_post_id: Any) -> bool:
+    posts = db.tables['blog_posts']
+    return any(posts.rows[key]['published'] is True for key in posts.lookup(('id',), (blog_post_id,)))
+
+@trigger_function('update_tag_post_count')
+def _update_tag_post_count(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+    if op in ('DELETE', 'UPDATE') and _post_published(db, old['blog_post_id']):
+        _adjust_tag_usage(db, 'post_count', [old['tag_id']], -1)
+    if op in ('INSERT', 'UPDATE') and _post_published(db, new['blog_post_id']):
+        _adjust_tag_usage(db, 'post_count', [new['tag_id']], 1)
+    return new
+
+@trigger_function('update_tag_project_count')
+def _update_tag_project_count(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+    if op in ('DELETE', 'UPDATE'):
+        _adjust_tag_usage(db, 'project_count', [old['tag_id']], -1)
+    if op in ('INSERT', 'UPDATE'):
+        _adjust_tag_usage(db, 'project_count', [new['tag_id']], 1)
+    return new
+
+@trigger_function('sync_tag_post_counts')
+def _sync_tag_post_counts(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+    links = db.tables['blog_post_tags']
+    if op == 'UPDATE' and old['published'] != new['published']:
+        if new['published'] is True or old['published'] is True:
+            tag_ids = [links.rows[key]['tag_id'] for key in links.lookup(('blog_post_id',), (new['id'],))]
+            _adjust_tag_usage(db, 'post_count', tag_ids, 1 if new['published'] is True else -1)
+    elif op == 'DELETE' and old['published'] is True:
+        tag_ids = [links.rows[key]['tag_id'] for key in links.lookup(('blog_post_id',), (old['id'],))]
+        _adjust_tag_usage(db, 'post_count', tag_ids, -1)
+    return new
+
+@generated_column('blog_posts', 'search_vector')
+def _blog_posts_search_vector(row: Dict[str, Any]) -> str:
+    return tsvector_text(tsvector_concat(
+        to_tsvector(row.get('title') or '', 'A'),
+        to_tsvector(row.get('excerpt') or '', 'B'),
+        to_tsvector(row.get('content') or '', 'C')
+    ))
+
+@rpc_function('search_blog_posts')
+def _search_blog_posts(db: LocalDatabase, role: str, search_query: str, max_results: int = 20,
+                       published_only: bool = True) -> List[Dict[str, Any]]:
+    posts = db.tables['blog_posts']
+    if not posts.allows(role, 'SELECT'):
+        return []
+    query = websearch_to_tsquery(search_query)
+    if not query:
+        return []
+
+    # Posting lists of each alternative's positive lexemes are intersected, then the
+    # alternatives are unioned; an alternative with only exclusions needs every row
+    index = posts.gin_indexes.get('search_vector')
+    candidates: Set[Tuple] = set()
+    for alternative in query:
+        required = [lexeme for negated, phrase in alternative if not negated for lexeme in phrase]
+        if index is None or not required:
+            candidates = set(posts.rows)
+            break
+        keys = set(index.get(required[0], ()))
+        for lexeme in required[1:]:
+            keys &= index.get(lexeme, set())
+        candidates |= keys
+
+    hits = []
+    for key in candidates:
+        row = posts.rows[key]
+        if published_only and row['published'] is not True:
+            continue
+        vector = parse_tsvector(row['search_vector'])
+        if tsquery_matches(vector, query):
+            hits.append({
+                'id': row['id'], 'title': row['title'], 'slug': row['slug'], 'excerpt': row['excerpt'],
+                'created_at': row['created_at'], 'rank': ts_rank(vector, query)
+            })
+    hits.sort(key=lambda hit: hit['created_at'], reverse=True)
+    hits.sort(key=lambda hit: hit['rank'], reverse=True)
+    return hits[:int(max_results)]
+
+def _insert_with_tags(db: LocalDatabase, role: str, table_name: str, payload: Dict[str, Any],
+                      junction_name: str, parent_column: str, tag_ids: Optional[List[str]]) -> Dict[str, Any]:
+    """Insert payload's known columns into table_name and link tag_ids through junction_name"""
+    table, junction = db.tables[table_name], db.tables[junction_name]
+    for target in (table, junction):
+        if not target.allows(role, 'INSERT'):
+            raise PostgrestError(403, '42501', f'new row violates row-level security policy for table "{target.name}"')
+    values = {name: value for name, value in (payload or {}).items() if name in table.columns}
+    if not values:
+        raise PostgrestError(400, '22023', f'payload has no {table_name} columns')
+    row = db.insert_row(table, db.build_row(table, values))
+    linked = list(dict.fromkeys(tag_ids or []))
+    for tag_id in linked:
+        db.insert_row(junction, db.build_row(junction, {parent_column: row['id'], 'tag_id': tag_id}))
+    # to_jsonb(new_row) - 'search_vector': the generated search column is internal
+    return {**{k: v for k, v in row.items() if k != 'search_vector'}, 'tag_ids': linked}
+
+@rpc_function('create_blog_post_with_tags')
+def _create_blog_post_with_tags(db: LocalDatabase, role: str, post: Dict[str, Any],
+                                tag_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    return _insert_with_tags(db, role, 'blog_posts', post, 'blog_post_tags', 'blog_post_id', tag_ids)
+
+@rpc_function('create_project_with_tags')
+def _create_project_with_tags(db: LocalDatabase, role: str, project: Dict[str, Any],
+                              tag_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    return _insert_with_tags(db, role, 'projects', project, 'project_tags', 'project_id', tag_ids)
+
+def _content_feed(db: LocalDatabase, role: str, table_name: str, columns: Tuple[str, ...],
+                  junction_name: str, parent_column: str, page_size: int,
+                  after_created_at: Optional[str], after_id: Optional[str],
+                  published_only: bool) -> Dict[str, Any]:
+    """One keyset page of table_name, newest first, with the rows' tags embedded"""
+    table, junction, tags = db.tables[table_name], db.tables[junction_name], db.tables['tags']
+    if not table.allows(role, 'SELECT'):
+        return {'items': [], 'next_cursor': None}
+    if (after_created_at is None) != (after_id is None):
+        raise PostgrestError(400, '22023', 'after_created_at and after_id must be given together')
+    page_size = min(max(int(page_size), 1), 100)
+    keys = table.lookup(('published',), (True,)) if published_only else list(table.rows)
+    rows = [table.rows[key] for key in keys]
+    if after_created_at is not None:
+        after = canonical_timestamp(after_created_at)
+        rows = [row for row in rows if (row['created_at'], row['id']) < (after, after_id)]
+    # The top page_size by (created_at, id), not a full sort, as the index descent would
+    page = heapq.nlargest(page_size, rows, key=lambda row: (row['created_at'], row['id']))
+
+    items = []
+    for row in page:
+        linked = [tags.rows[(link['tag_id'],)] for link in
+                  (junction.rows[key] for key in junction.lookup((parent_column,), (row['id'],)))]
+        items.append({
+            **{column: row[column] for column in columns},
+            'tags': [{'id': tag['id'], 'name': tag['name'], 'slug': tag['slug'], 'color': tag['color']}
+                     for tag in sorted(linked, key=lambda tag: tag['name'])]
+        })
+    next_cursor = None
+    if len(page) == page_size:
+        next_cursor = {'created_at': page[-1]['created_at'], 'id': page[-1]['id']}
+    return {'items': items, 'next_cursor': next_cursor}
+
+@rpc_function('get_blog_post_feed')
+def _get_blog_post_feed(db: LocalDatabase, role: str, page_size: int = 20,
+                        after_created_at: Optional[str] = None, after_id: Optional[str] = None) -> Dict[str, Any]:
+    columns = ('id', 'title', 'slug', 'excerpt', 'category_id', 'series_id', 'created_at')
+    return _content_feed(db, role, 'blog_posts', columns, 'blog_post_tags', 'blog_post_id',
+                         page_size, after_created_at, after_id, published_only=True)
+
+@rpc_function('get_project_feed')
+def _get_project_feed(db: LocalDatabase, role: str, page_size: int = 20,
+                      after_created_at: Optional[str] = None, after_id: Optional[str] = None) -> Dict[str, Any]:
+    columns = ('id', 'title', 'description', 'image_url', 'category', 'category_id', 'featured', 'created_at')
+    return _content_feed(db, role, 'projects', columns, 'project_tags', 'project_id',
+                         page_size, after_created_at, after_id, published_only=False)
+
+def _filter_by_tags(db: LocalDatabase, role: str, table_name: str, columns: Tuple[str, ...],
+                    junction_name: str, parent_column: str, count_column: str, all_tags: Optional[List[str]],
+                    any_tags: Optional[List[str]], none_tags: Optional[List[str]],
+                    max_results: int, published_only: bool) -> List[Dict[str, Any]]:
+    """Rows carrying all_tags, one of any_tags and none of none_tags, newest first"""
+    table, junction = db.tables[table_name], db.tables[junction_name]
+    if not table.allows(role, 'SELECT') or not junction.allows(role, 'SELECT'):
+        return []
+
+    def postings(tag_ids: Iterable[str]) -> Set[Any]:
+        return {junction.rows[key][parent_column]
+                for tag_id in tag_ids for key in junction.lookup(('tag_id',), (tag_id,))}
+
+    def carries(row_id: Any, tag_ids: Iterable[str]) -> bool:
+        return any(junction.lookup((parent_column, 'tag_id'), (row_id, tag_id)) for tag_id in tag_ids)
+
+    def usage(tag_id: str) -> int:
+        keys = db.tables['tags'].lookup(('id',), (tag_id,))
+        return db.tables['tags'].rows[keys[0]][count_column] if keys else 0
+
+    # Candidates come from the required tag with the lowest usage counter, else from
+    # any_tags; every other condition is a primary key probe per candidate
+    required = list(dict.fromkeys(all_tags or []))
+    if required:
+        ids = postings([min(required, key=usage)])
+    elif any_tags:
+        ids = postings(any_tags)
+    else:
+        ids = {row['id'] for row in table.rows.values()}
+    ids = {
+        row_id for row_id in ids
+        if all(carries(row_id, [tag_id]) for tag_id in required)
+        and (not any_tags or carries(row_id, any_tags))
+        and not carries(row_id, none_tags or [])
+    }
+
+    rows = [table.rows[(row_id,)] for row_id in ids]
+    if published_only:
+        rows = [row for row in rows if row['published'] is True]
+    top = heapq.nlargest(int(max_results), rows, key=lambda row: (row['created_at'], row['id']))
+    return [{column: row[column] for column in columns} for row in top]
+
+@rpc_function('filter_blog_posts_by_tags')
+def _filter_blog_posts_by_tags(db: LocalDatabase, role: str, all_tags: Optional[List[str]] = None,
+                               any_tags: Optional[List[str]] = None, none_tags: Optional[List[str]] = None,
+                               max_results: int = 50, published_only: bool = True) -> List[Dict[str, Any]]:
+    return _filter_by_tags(db, role, 'blog_posts', ('id', 'title', 'slug', 'excerpt', 'created_at'),
+                           'blog_post_tags', 'blog_post_id', 'post_count', all_tags, any_tags, none_tags,
+                           max_results, published_only)
+
+@rpc_function('filter_projects_by_tags')
+def _filter_projects_by_tags(db: LocalDatabase, role: str, all_tags: Optional[List[str]] = None,
+                             any_tags: Optional[List[str]] = None, none_tags: Optional[List[str]] = None,
+                             max_results: int = 50) -> List[Dict[str, Any]]:
+    return _filter_by_tags(db, role, 'projects', ('id', 'title', 'description', 'category', 'created_at'),
+                           'project_tags', 'project_id', 'project_count', all_tags, any_tags, none_tags,
+                           max_results, published_only=False)
+
+# Content table -> (junction, junction parent column, precomputed related table)
+RELATED_SOURCES = {
+    'blog_posts': ('blog_post_tags', 'blog_post_id', 'related_blog_posts'),
+    'projects': ('project_tags', 'project_id', 'related_projects'),
+}
+
+def _compute_related(db: LocalDatabase, content_type: str, target: Any, top_k: int,
+                     postings: Optional[Dict[Any, List[Any]]] = None) -> List[Dict[str, Any]]:
+    """Top top_k rows sharing the most tag weight (1 / ln(2 + tag link count)) with target.
+
+    postings caches each tag's content ids across calls while the junction is unchanged.
+    """
+    junction_name, parent_column, _ = RELATED_SOURCES[content_type]
+    junction, content = db.tables[junction_name], db.tables[content_type]
+    postings = {} if postings is None else postings
+    scores: Dict[Any, List[float]] = {}
+    for mine in junction.lookup((parent_column,), (target,)):
+        tag_id = junction.rows[mine]['tag_id']
+        if tag_id not in postings:
+            postings[tag_id] = [junction.rows[key][parent_column] for key in junction.lookup(('tag_id',), (tag_id,))]
+        weight = 1.0 / math.log(2 + len(postings[tag_id]))
+        for other in postings[tag_id]:
+            if other != target:
+                entry = scores.setdefault(other, [0.0, 0])
+                entry[0] += weight
+                entry[1] += 1
+    if content_type == 'blog_posts':
+        # Rows are keyed by their primary key, (id,)
+        scores = {other: entry for other, entry in scores.items()
+                  if (content.rows.get((other,)) or {}).get('published') is True}
+    ranked = heapq.nsmallest(int(top_k), scores.items(), key=lambda item: (-item[1][0], item[0]))
+    return [{'related_id': other, 'score': score, 'shared_tags': shared} for other, (score, shared) in ranked]
+
+@rpc_function('compute_related_blog_posts')
+def _compute_related_blog_posts(db: LocalDatabase, role: str, target: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    if not db.tables['blog_post_tags'].allows(role, 'SELECT'):
+        return []
+    return _compute_related(db, 'blog_posts', target, top_k)
+
+@rpc_function('compute_related_projects')
+def _compute_related_projects(db: LocalDatabase, role: str, target: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    if not db.tables['project_tags'].allows(role, 'SELECT'):
+        return []
+    return _compute_related(db, 'projects', target, top_k)
+
+@rpc_function('refresh_related_content')
+def _refresh_related_content(db: LocalDatabase, role: str) -> Dict[str, int]:
+    queue = db.tables['related_content_queue']
+    for name in ('related_content_queue', 'related_blog_posts', 'related_projects'):
+        if not db.tables[name].allows(role, 'DELETE'):
+            raise PostgrestError(403, '42501', f'permission denied for table {name}')
+    affected: Dict[str, Set[Any]] = {content_type: set() for content_type in RELATED_SOURCES}
+    for key in list(queue.rows):
+        change = db.delete_row(queue, key)
+        junction_name, parent_column, _ = RELATED_SOURCES[change['content_type']]
+        junction = db.tables[junction_name]
+        affected[change['content_type']].add(change['content_id'])
+        affected[change['content_type']].update(
+            junction.rows[link][parent_column] for link in junction.lookup(('tag_id',), (change['tag_id'],))
+        )
+
+    for content_type, ids in affected.items():
+        _, parent_column, related_name = RELATED_SOURCES[content_type]
+        related, content = db.tables[related_name], db.tables[content_type]
+        postings: Dict[Any, List[Any]] = {}
+        for source in ids:
+            for key in related.lookup((parent_column,), (source,)):
+                db.delete_row(related, key)
+            # Deleted content is gone from the junction and, by cascade, from the related tables
+            if not content.lookup(('id',), (source,)):
+                continue
+            for row in _compute_related(db, content_type, source, 10, postings):
+                db.insert_row(related, db.build_row(related, {parent_column: source, **row}))
+    return {content_type: len(ids) for content_type, ids in affected.items()}
+
+def _enqueue_related(db: LocalDatabase, content_type: str, tag_id: Any, content_id: Any):
+    """INSERT INTO related_content_queue VALUES (...) ON CONFLICT DO NOTHING"""
+    queue = db.tables['related_content_queue']
+    values = (content_type, tag_id, content_id)
+    if not queue.lookup(('content_type', 'tag_id', 'content_id'), values):
+        db.insert_row(queue, db.build_row(queue, dict(zip(('content_type', 'tag_id', 'content_id'), values))))
+
+@trigger_function('enqueue_related_content')
+def _enqueue_related_content(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+    content_type = 'blog_posts' if table == 'blog_post_tags' else 'projects'
+    parent_column = RELATED_SOURCES[content_type][1]
+    if op in ('DELETE', 'UPDATE'):
+        _enqueue_related(db, content_type, old['tag_id'], old[parent_column])
+    if op in ('INSERT', 'UPDATE'):
+        _enqueue_related(db, content_type, new['tag_id'], new[parent_column])
+    return None
+
+@trigger_function('enqueue_related_blog_post_publish')
+def _enqueue_related_blog_post_publish(db: LocalDatabase, op: str, new: Optional[Dict[str, Any]], old: Optional[Dict[str, Any]], table: str):
+    if old['published'] != new['published']:
+        links = db.tables['blog_post_tags']
+        for key in links.lookup(('blog_post_id',), (new['id'],)):
+            _enqueue_related(db, 'blog_posts', links.rows[key]['tag_id'], new['id'])
+    return new
+
+@rpc_function('pick_image_variants')
+def _pick_image_variants(db: LocalDatabase, role: str, sources: List[str], min_width: int,
+                         formats: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    variants = db.tables['image_variants']
+    if not variants.allows(role, 'SELECT'):
+        return []
+    formats = ['avif', 'webp'] if formats is None else formats
+    picked = []
+    for source in sorted(set(sources)):
+        source_path = re.sub(r'^.*/storage/v1/object/public/images/', '', source)
+        rows = [variants.rows[key] for key in variants.lookup(('source_path',), (source_path,))]
+        rows = [row for row in rows if row['format'] in formats]
+        if not rows:
+            continue
+        # First accepted format, then the narrowest wide enough variant, else the widest
+        best = min(rows, key=lambda row: (formats.index(row['format']), row['width'] < int(min_width),
+                                          row['width'] if row['width'] >= int(min_width) else -row['width']))
+        picked.append({'source': source, **{column: best[column] for column in
+                                            ('path', 'format', 'width', 'height', 'bytes')}})
+    return picked
+
+def _require(db: LocalDatabase, role: str, command: str, *table_names: str):
+    for name in table_names:
+        if not db.tables[name].allows(role, command):
+            raise PostgrestError(403, '42501', f'permission denied for table {name}')
+
+@rpc_function('claim_media_object')
+def _claim_media_object(db: LocalDatabase, role: str, bucket: str, content_hash: str, object_path: str,
+                        object_bytes: int, referrer: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
+    _require(db, role, 'INSERT', 'media_objects', 'media_references')
+    media, references = db.tables['media_objects'], db.tables['media_references']
+    keys = media.lookup(('bucket_id', 'content_hash'), (bucket, content_hash))
+    if keys:
+        row = media.rows[keys[0]]
+    else:
+        row = db.insert_row(media, db.build_row(media, {
+            'bucket_id': bucket, 'content_hash': content_hash, 'path': object_path,
+            'bytes': object_bytes, 'mime_type': mime_type
+        }))
+    if not references.lookup(('bucket_id', 'content_hash', 'referrer'), (bucket, content_hash, referrer)):
+        db.insert_row(references, db.build_row(references, {
+            'bucket_id': bucket, 'content_hash': content_hash, 'referrer': referrer
+        }))
+    return {'path': row['path'], 'bytes': row['bytes'], 'existing': row['uploaded_at'] is not None}
+
+@rpc_function('confirm_media_object')
+def _confirm_media_object(db: LocalDatabase, role: str, bucket: str, content_hash: str) -> None:
+    _require(db, role, 'UPDATE', 'media_objects')
+    media = db.tables['media_objects']
+    for key in media.lookup(('bucket_id', 'content_hash'), (bucket, content_hash)):
+        if media.rows[key]['uploaded_at'] is None:
+            db.update_row(media, key, {'uploaded_at': now_timestamp()})
+    return None
+
+@rpc_function('release_media_reference')
+def _release_media_reference(db: LocalDatabase, role: str, bucket: str, content_hash: str,
+                             referrer: str) -> Optional[str]:
+    _require(db, role, 'DELETE', 'media_objects', 'media_references')
+    media, references = db.tables['media_objects'], db.tables['media_references']
+    keys = media.lookup(('bucket_id', 'content_hash'), (bucket, content_hash))
+    if not keys:
+        return None
+    for key in references.lookup(('bucket_id', 'content_hash', 'referrer'), (bucket, content_hash, referrer)):
+        db.delete_row(references, key)
+    if references.lookup(('bucket_id', 'content_hash'), (bucket, content_hash)):
+        return None
+    return db.delete_row(media, keys[0])['path']
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+class StorageError(Exception):
+    """Error rendered in the Storage API's JSON error format"""
+
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.error = error
+        self.message = message
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'statusCode': str(self.status), 'error': self.error, 'message': self.message}
+
+
+def parse_sql_literal(text: str) -> Any:
+    """A constant from a VALUES list: 'text', numbers, booleans, NULL or ARRAY[...]"""
+    text = text.strip()
+    lowered = text.lower()
+    if lowered == 'null':
+        return None
+    if lowered in ('true', 'false'):
+        return lowered == 'true'
+    if lowered.startswith('array[') and text.endswith(']'):
+        return [parse_sql_literal(item) for item in split_sql_list(text[6:-1])]
+    literal = re.match(r"^'(.*)'(?:::[\w\[\] ]+)?$", text, re.DOTALL)
+    if literal:
+        return literal.group(1).replace("''", "'")
+    return int(text) if re.match(r'^-?\d+$', text) else float(text)
+
+
+def parse_multipart(body: bytes, content_type: str) -> Dict[str, Tuple[Dict[str, str], bytes]]:
+    """Parts of a multipart/form-data body by field name, as (lower-cased headers, content)"""
+    match = re.search(r'boundary="?([^";]+)"?', content_type)
+    if match is None:
+        raise StorageError(400, 'InvalidRequest', 'Missing multipart boundary')
+    delimiter = b'--' + match.group(1).encode()
+    parts: Dict[str, Tuple[Dict[str, str], bytes]] = {}
+    position = body.find(delimiter)
+    while position != -1:
+        start = position + len(delimiter)
+        if body[start:start + 2] == b'--':
+            break
+        header_end = body.find(b'\r\n\r\n', start)
+        end = body.find(b'\r\n' + delimiter, header_end)
+        if header_end == -1 or end == -1:
+            raise StorageError(400, 'InvalidRequest', 'Malformed multipart body')
+        headers = {}
+        for line in body[start:header_end].decode('latin-1').split('\r\n'):
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        field = re.search(r'\bname="([^"]*)"', headers.get('content-disposition', ''))
+        if field:
+            parts[field.group(1)] = (headers, body[header_end + 4:end])
+        position = end + 2
+    return parts
+
+
+# TUS 1.0.0 as served by Storage's /upload/resumable endpoint, plus the concatenation
+# extension so a client can upload parts of one object in parallel
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,checksum,concatenation'
+TUS_CHECKSUM_ALGORITHMS = {'sha1': hashlib.sha1, 'md5': hashlib.md5, 'sha256': hashlib.sha256}
+TUS_MAX_SIZE = 5 * 1024 ** 3
+
+
+def parse_upload_metadata(header: str) -> Dict[str, str]:
+    """TUS Upload-Metadata: comma-separated 'key base64value' pairs"""
+    metadata = {}
+    for pair in header.split(','):
+        key, _, value = pair.strip().partition(' ')
+        if key:
+            metadata[key] = base64.b64decode(value).decode() if value else ''
+    return metadata
+
+
+class LocalStorage:
+    """In-memory Storage buckets and objects with the migrations' size limits, MIME
+    allow-lists and storage.objects policies. Objects live under their own lock so
+    large uploads don't hold up table requests."""
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, Any]] = {}
+        # (command, bucket_id, role required or None) per storage.objects policy
+        self.policies: List[Tuple[str, Optional[str], Optional[str]]] = []
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # In-progress resumable uploads by id
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+
+    def bucket(self, bucket_id: str) -> Dict[str, Any]:
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            raise StorageError(404, 'Bucket not found', 'Bucket not found')
+        return bucket
+
+    def allows(self, role: str, command: str, bucket_id: str) -> bool:
+        if role == 'service_role':
+            return True
+        return any(
+            policy_command in (command, 'ALL') and bucket in (None, bucket_id)
+            and (required is None or required == role)
+            for policy_command, bucket, required in self.policies
+        )
+
+    def check_upload(self, role: str, bucket_id: str, size: int, mimetype: str, command: str = 'INSERT'):
+        """The checks storage-api runs before writing an object, in its order"""
+        bucket = self.bucket(bucket_id)
+        limit = bucket.get('file_size_limit')
+        if limit is not None and size > limit:
+            raise StorageError(413, 'Payload too large', 'The object exceeded the maximum allowed size')
+        allowed = bucket.get('allowed_mime_types')
+        mime = mimetype.split(';')[0].strip().lower()
+        if allowed and not any(
+            mime == pattern or (pattern.endswith('/*') and mime.startswith(pattern[:-1])) for pattern in allowed
+        ):
+            raise StorageError(415, 'invalid_mime_type', f'mime type {mime} is not supported')
+        if not self.allows(role, command, bucket_id):
+            raise StorageError(403, 'Unauthorized', 'new row violates row-level security policy')
+
+    def put(self, role: str, owner: Optional[str], bucket_id: str, name: str, content: bytes,
+            mimetype: str, cache_control: str = '3600', upsert: bool = False,
+            update: bool = False) -> Dict[str, Any]:
+        self.check_upload(role, bucket_id, len(content), mimetype, 'UPDATE' if update else 'INSERT')
+        with self.lock:
+            existing = self.objects.get((bucket_id, name))
+            if update and existing is None:
+                raise StorageError(404, 'not_found', 'Object not found')
+            if existing is not None and not (upsert or update):
+                raise StorageError(409, 'Duplicate', 'The resource already exists')
+            now = now_timestamp()
+            stored = {
+                'id': existing['id'] if existing else str(uuid.uuid4()),
+                'bucket_id': bucket_id,
+                'name': name,
+                'owner': owner,
+                'created_at': existing['created_at'] if existing else now,
+                'updated_at': now,
+                'last_accessed_at': now,
+                'metadata': {
+                    'eTag': f'"{hashlib.md5(content).hexdigest()}"',
+                    'size': len(content),
+                    'mimetype': mimetype.split(';')[0].strip(),
+                    'cacheControl': f'max-age={cache_control}',
+                    'lastModified': now,
+                    'contentLength': len(content),
+                    'httpStatusCode': 200
+                },
+                'content': content
+            }
+            self.objects[(bucket_id, name)] = stored
+            return stored
+
+    def get(self, role: str, bucket_id: str, name: str, public: bool = False) -> Dict[str, Any]:
+        bucket = self.bucket(bucket_id)
+        if public and not bucket.get('public'):
+            raise StorageError(400, 'not_found', 'Object not found')
+        if not public and not self.allows(role, 'SELECT', bucket_id):
+            raise StorageError(400, 'not_found', 'Object not found')
+        with self.lock:
+            stored = self.objects.get((bucket_id, name))
+        if stored is None:
+            raise StorageError(400, 'not_found', 'Object not found')
+        return stored
+
+    # -- resumable uploads ------------------------------------------------------
+
+    def create_upload(self, role: str, owner: Optional[str], length: Optional[int],
+                      metadata: Dict[str, str], partial: bool = False, upsert: bool = False) -> Dict[str, Any]:
+        """Start a TUS upload; a whole-object upload is checked against its bucket before any data is sent"""
+        if length is None or length < 0:
+            raise StorageError(400, 'InvalidRequest', 'Upload-Length is required')
+        if length > TUS_MAX_SIZE:
+            raise StorageError(413, 'Payload too large', 'The object exceeded the maximum allowed size')
+        if not partial:
+            self._check_target(role, metadata, length, upsert)
+        upload = {
+            'id': uuid.uuid4().hex,
+            'role': role,
+            'owner': owner,
+            'length': length,
+            'data': bytearray(),
+            'metadata': metadata,
+            'partial': partial,
+            'upsert': upsert,
+            'lock': threading.Lock()
+        }
+        with self.lock:
+            self.uploads[upload['id']] = upload
+        return upload
+
+    def upload(self, upload_id: str) -> Dict[str, Any]:
+        with self.lock:
+            upload = self.uploads.get(upload_id)
+        if upload is None:
+            raise StorageError(404, 'not_found', 'Upload not found')
+        return upload
+
+    def append_upload(self, upload_id: str, offset: int, chunk: bytes,
+                      checksum: Optional[str] = None) -> Dict[str, Any]:
+        """PATCH: append a chunk at the current offset, verifying Upload-Checksum when sent"""
+        upload = self.upload(upload_id)
+        if checksum:
+            algorithm, _, digest = checksum.partition(' ')
+            hasher = TUS_CHECKSUM_ALGORITHMS.get(algorithm.lower())
+            if hasher is None:
+                raise StorageError(400, 'InvalidRequest', f'Unsupported checksum algorithm: {algorithm}')
+            if base64.b64encode(hasher(chunk).digest()).decode() != digest:
+                raise StorageError(460, 'ChecksumMismatch', 'Checksum mismatch')
+        with upload['lock']:
+            if offset != len(upload['data']):
+                raise StorageError(409, 'OffsetMismatch', f"Upload-Offset {offset} does not match {len(upload['data'])}")
+            if offset + len(chunk) > upload['length']:
+                raise StorageError(413, 'Payload too large', 'Chunk runs past Upload-Length')
+            upload['data'] += chunk
+            if len(upload['data']) == upload['length'] and not upload['partial']:
+                self._finish_upload(upload, bytes(upload['data']))
+            return upload
+
+    def concat_uploads(self, role: str, owner: Optional[str], part_ids: List[str],
+                       metadata: Dict[str, str], upsert: bool = False) -> Dict[str, Any]:
+        """Upload-Concat: final; join completed partial uploads into one object"""
+        parts = [self.upload(part_id) for part_id in part_ids]
+        if not parts or any(not part['partial'] or len(part['data']) != part['length'] for part in parts):
+            raise StorageError(400, 'InvalidRequest', 'Every partial upload must be complete before concatenation')
+        length = sum(part['length'] for part in parts)
+        self._check_target(role, metadata, length, upsert)
+        upload = {
+            'id': uuid.uuid4().hex, 'role': role, 'owner': owner, 'length': length, 'data': None,
+            'metadata': metadata, 'partial': False, 'upsert': upsert, 'lock': threading.Lock()
+        }
+        self._finish_upload(upload, b''.join(bytes(part['data']) for part in parts))
+        with self.lock:
+            for part_id in part_ids:
+                self.uploads.pop(part_id, None)
+            self.uploads[upload['id']] = upload
+        return upload
+
+    def terminate_upload(self, upload_id: str):
+        with self.lock:
+            if self.uploads.pop(upload_id, None) is None:
+                raise StorageError(404, 'not_found', 'Upload not found')
+
+    @staticmethod
+    def upload_offset(upload: Dict[str, Any]) -> int:
+        return upload['length'] if upload['data'] is None else len(upload['data'])
+
+    def _check_target(self, role: str, metadata: Dict[str, str], length: int, upsert: bool):
+        if not metadata.get('bucketName') or not metadata.get('objectName'):
+            raise StorageError(400, 'InvalidRequest', 'Upload-Metadata needs bucketName and objectName')
+        self.check_upload(role, metadata['bucketName'], length,
+                          metadata.get('contentType', 'application/octet-stream'))
+        with self.lock:
+            exists = (metadata['bucketName'], metadata['objectName']) in self.objects
+        if exists and not upsert:
+            raise StorageError(409, 'Duplicate', 'The resource already exists')
+
+    def _finish_upload(self, upload: Dict[str, Any], content: bytes):
+        metadata = upload['metadata']
+        self.put(upload['role'], upload['owner'], metadata['bucketName'], metadata['objectName'], content,
+                 metadata.get('contentType', 'application/octet-stream'), metadata.get('cacheControl', '3600'),
+                 upsert=upload['upsert'])
+        # Completed uploads keep answering HEAD with their final offset, without the bytes
+        upload['data'] = None
+
+    def remove(self, role: str, bucket_id: str, names: List[str]) -> List[Dict[str, Any]]:
+        self.bucket(bucket_id)
+        if not self.allows(role, 'DELETE', bucket_id):
+            return []
+        with self.lock:
+            removed = [self.objects.pop((bucket_id, name), None) for name in names]
+        return [object_info(stored) for stored in removed if stored is not None]
+
+    def list_page(self, role: str, bucket_id: str, prefix: str = '', limit: int = 1000,
+                  cursor: Optional[str] = None, with_delimiter: bool = False) -> Dict[str, Any]:
+        """One page of the bucket's objects under prefix in name order (list-v2).
+
+        Without the delimiter every object below prefix is listed by its full name;
+        with it, deeper names collapse into one folder entry per next path segment.
+        The cursor is the last name of the previous page.
+        """
+        self.bucket(bucket_id)
+        if not self.allows(role, 'SELECT', bucket_id):
+            return {'hasNext': False, 'folders': [], 'objects': [], 'nextCursor': None}
+        after = _b64url_decode(cursor).decode() if cursor else ''
+        if after.endswith('/'):
+            # A folder ended the last page; continue after everything inside it
+            after += '\U0010ffff'
+        with self.lock:
+            names = [name for (bucket, name) in self.objects
+                     if bucket == bucket_id and name.startswith(prefix) and name > after]
+            entries: Dict[str, Optional[Dict[str, Any]]] = {}
+            for name in sorted(names):
+                rest = name[len(prefix):]
+                if with_delimiter and '/' in rest:
+                    folder = prefix + rest.split('/', 1)[0] + '/'
+                    entries.setdefault(folder, None)
+                else:
+                    entries[name] = object_info(self.objects[(bucket_id, name)])
+                if len(entries) > limit:
+                    break
+        page = list(entries.items())[:limit]
+        has_next = len(entries) > limit
+        return {
+            'hasNext': has_next,
+            'folders': [{'key': key, 'name': key[len(prefix):].rstrip('/')} for key, info in page if info is None],
+            'objects': [{**info, 'key': key} for key, info in page if info is not None],
+            'nextCursor': _b64url(page[-1][0].encode()) if has_next else None
+        }
+
+
+def object_info(stored: Dict[str, Any]) -> Dict[str, Any]:
+    """An object row as the Storage API returns it (without its content)"""
+    return {key: value for key, value in stored.items() if key != 'content'}
+
+
+# ---------------------------------------------------------------------------
+# HTTP layer
+# ---------------------------------------------------------------------------
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def parse_prefer(header: str) -> Dict[str, str]:
+    prefer = {}
+    for part in header.split(','):
+        key, _, value = part.strip().partition('=')
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+class LocalSupabaseTransport(httpx.BaseTransport):
+    """httpx transport serving the PostgREST, auth and storage endpoints from a LocalSupabase"""
+
+    def __init__(self, backend: 'LocalSupabase'):
+        self.backend = backend
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        path = request.url.path
+        try:
+            if path.startswith('/rest/v1/'):
+                return self.backend.handle_rest(request, path[len('/rest/v1/'):])
+            if path.startswith('/auth/v1/'):
+                return self.backend.handle_auth(request, path[len('/auth/v1/'):])
+            if path.startswith('/storage/v1/'):
+                return self.backend.handle_storage(request, path[len('/storage/v1/'):])
+            raise PostgrestError(404, 'PGRST000', f"No local handler for {path}")
+        except PostgrestError as e:
+            return json_response(e.status, e.to_json())
+
+def json_response(status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    content = b'' if body is None else json.dumps(body, separators=(',', ':')).encode()
+    return httpx.Response(
+        status,
+        headers={'content-type': 'application/json; charset=utf-8', **(headers or {})},
+        content=content
+    )
+
+
+class LocalSupabase:
+    """Offline Supabase: a LocalDatabase behind PostgREST/auth-compatible endpoints"""
+
+    def __init__(self, migrations_dir: str = MIGRATIONS_DIR, users: Optional[Dict[str, str]] = None):
+        self.db = LocalDatabase(migrations_dir)
+        self.users = dict(users or {})
+        self._jwt_secret = secrets.token_bytes(32)
+        self.anon_key = self.sign_jwt({'iss': 'supabase-local', 'role': 'anon'})
+        self.service_role_key = self.sign_jwt({'iss': 'supabase-local', 'role': 'service_role'})
+        self.transport = LocalSupabaseTransport(self)
+
+    def create_client(self, key: Optional[str] = None, http_client: Optional[httpx.Client] = None):
+        """A real supabase Client whose HTTP traffic is served by this stand-in"""
+        from supabase import ClientOptions, create_client
+        http_client = http_client or httpx.Client(transport=self.transport)
+        return create_client(
+            LOCAL_SUPABASE_URL,
+            key or self.anon_key,
+            options=ClientOptions(httpx_client=http_client, auto_refresh_token=False)
+        )
+
+    # -- auth -----------------------------------------------------------------
+
+    def sign_jwt(self, claims: Dict[str, Any]) -> str:
+        header = _b64url(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+        payload = _b64url(json.dumps(claims).encode())
+        signature = hmac.new(self._jwt_secret, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+        return f"{header}.{payload}.{_b64url(signature)}"
+
+    def verify_jwt(self, token: str) -> Dict[str, Any]:
+        try:
+            header, payload, signature = token.split('.')
+            expected = hmac.new(self._jwt_secret, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, _b64url_decode(signature)):
+                raise ValueError("bad signature")
+            claims = json.loads(_b64url_decode(payload))
+        except ValueError:
+            raise PostgrestError(401, 'PGRST301', 'JWSError JWSInvalidSignature')
+        if claims.get('exp') and claims['exp'] < time.time():
+            raise PostgrestError(401, 'PGRST303', 'JWT expired')
+        return claims
+
+    def request_role(self, request: httpx.Request) -> str:
+        authorization = request.headers.get('authorization', '')
+        if not authorization.lower().startswith('bearer '):
+            return 'anon'
+        return self.verify_jwt(authorization[7:]).get('role', 'anon')
+
+    def _user(self, email: str) -> Dict[str, Any]:
+        created = canonical_timestamp(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        return {
+            'id': str(uuid.uuid5(uuid.NAMESPACE_URL, f"local-supabase:{email}")),
+            'aud': 'authenticated',
+            'role': 'authenticated',
+            'email': email,
+            'app_metadata': {'provider': 'email', 'providers': ['email']},
+            'user_metadata': {},
+            'created_at': created,
+            'updated_at': created,
+            'email_confirmed_at': created,
+            'last_sign_in_at': now_timestamp()
+        }
+
+    def handle_auth(self, request: httpx.Request, route: str) -> httpx.Response:
+        if route == 'token' and request.url.params.get('grant_type') == 'password':
+            body = json.loads(request.content or b'{}')
+            email, password = body.get('email'), body.get('password')
+            if email not in self.users or self.users[email] != password:
+                return json_response(400, {
+                    'code': 400, 'error_code': 'invalid_credentials', 'msg': 'Invalid login credentials'
+                })
+            user = self._user(email)
+            expires_in = 3600
+            access_token = self.sign_jwt({
+                'sub': user['id'], 'email': email, 'role': 'authenticated', 'aud': 'authenticated',
+                'iat': int(time.time()), 'exp': int(time.time()) + expires_in
+            })
+            return json_response(200, {
+                'access_token': access_token,
+                'token_type': 'bearer',
+                'expires_in': expires_in,
+                'expires_at': int(time.time()) + expires_in,
+                'refresh_token': secrets.token_hex(16),
+                'user': user
+            })
+        if route == 'user' and request.method == 'GET':
+            authorization = request.headers.get('authorization', '')
+            claims = self.verify_jwt(authorization[7:]) if authorization.lower().startswith('bearer ') else {}
+            if claims.get('role') != 'authenticated':
+                return json_response(401, {'code': 401, 'error_code': 'no_authorization', 'msg': 'This endpoint requires a valid Bearer token'})
+            return json_response(200, self._user(claims['email']))
+        if route == 'logout':
+            return httpx.Response(204)
+        return json_response(404, {'code': 404, 'error_code': 'not_found', 'msg': f'Unsupported auth route: {route}'})
+
+    # -- PostgREST ------------------------------------------------------------
+
+    def handle_rest(self, request: httpx.Request, route: str) -> httpx.Response:
+        role = self.request_role(request)
+        if route.startswith('rpc/'):
+            return self._rpc(request, route[len('rpc/'):], role)
+
+        accept = request.headers.get('accept', '')
+        if 'application/vnd.pgrst.plan' in accept:
+            return self._explain(request, route, accept, role)
+
+        table = self.db.table(route)
+        prefer = parse_prefer(request.headers.get('prefer', ''))
+        params = request.url.params
+        filters, embed_options = self._parse_filters(params)
+
+        with self.db.transaction():
+            if request.method in ('GET', 'HEAD'):
+                return self._select(request, table, params, filters, embed_options, prefer, role)
+            if request.method == 'POST':
+                return self._insert(request, table, params, prefer, role)
+            if request.method == 'PATCH':
+                return self._mutate(request, table, params, filters, prefer, role, 'UPDATE')
+            if request.method == 'DELETE':
+                return self._mutate(request, table, params, filters, prefer, role, 'DELETE')
+        raise PostgrestError(405, 'PGRST117', f'Unsupported HTTP method: {request.method}')
+
+    def _parse_filters(self, params: httpx.QueryParams) -> Tuple[List[Any], Dict[str, Dict[str, Any]]]:
+        filters: List[Any] = []
+        embed_options: Dict[str, Dict[str, Any]] = {}
+        for key, value in params.multi_items():
+            logic = re.match(r'^(?:(.+)\.)?(not\.)?(or|and)$', key)
+            if logic:
+                node = parse_logic_tree(logic.group(3), value, bool(logic.group(2)))
+                if logic.group(1):
+                    embed_options.setdefault(logic.group(1), {}).setdefault('filters', []).append(node)
+                else:
+                    filters.append(node)
+                continue
+            if key in RESERVED_PARAMS:
+                continue
+            path, _, leaf = key.rpartition('.')
+            if path:
+                options = embed_options.setdefault(path, {})
+                if leaf == 'order':
+                    options['order'] = self._parse_order(value)
+                elif leaf == 'limit':
+                    options['limit'] = int(value)
+                elif leaf == 'offset':
+                    options['offset'] = int(value)
+                else:
+                    options.setdefault('filters', []).append(parse_condition(leaf, value))
+            else:
+                filters.append(parse_condition(key, value))
+        return filters, embed_options
+
+    @staticmethod
+    def _parse_order(value: str) -> List[Tuple[str, bool, Optional[bool]]]:
+        order = []
+        for part in value.split(','):
+            pieces = part.split('.')
+            desc = 'desc' in pieces[1:]
+            nullsfirst = True if 'nullsfirst' in pieces[1:] else False if 'nullslast' in pieces[1:] else None
+            order.append((pieces[0], desc, nullsfirst))
+        return order
+
+    def _explain(self, request: httpx.Request, route: str, accept: str, role: str) -> httpx.Response:
+        """Accept: application/vnd.pgrst.plan+json; options=analyze|... (reads only)"""
+        if request.method not in ('GET', 'HEAD') or 'plan+json' not in accept:
+            raise PostgrestError(406, 'PGRST107', 'The local stand-in only explains reads, as JSON plans')
+        options = re.search(r'options=([\w|]*)', accept)
+        analyze = bool(options) and 'analyze' in options.group(1).split('|')
+        table = self.db.table(route)
+        params = request.url.params
+        filters, _ = self._parse_filters(params)
+        order = self._parse_order(params['order']) if params.get('order') else []
+        limit = int(params['limit']) if 'limit' in params else None
+        with self.db.transaction():
+            plan = self.db.explain(table, filters, order, limit, int(params.get('offset', 0)),
+                                   analyze, table.allows(role, 'SELECT'))
+        return json_response(200, plan, {'content-type': 'application/vnd.pgrst.plan+json; charset=utf-8'})
+
+    def _select(self, request: httpx.Request, table: Table, params: httpx.QueryParams,
+                filters: List[Any], embed_options: Dict[str, Dict[str, Any]],
+                prefer: Dict[str, str], role: str) -> httpx.Response:
+        items = parse_select(params.get('select', '*'))
+        keys = self.db.filter_rows(table, filters) if table.allows(role, 'SELECT') else []
+        rows = [table.rows[key] for key in keys]
+        if params.get('order'):
+            rows = self.db.order_rows(rows, self._parse_order(params['order']))
+
+        # !inner embeds filter parents, so they apply before counting and paging
+        if any(item.kind == 'embed' and item.inner for item in items):
+            inner_items = [item for item in items if item.kind == 'embed' and item.inner]
+            rows = [row for row in rows if all(
+                self.db._embed(table, row, item, embed_options, item.alias) for item in inner_items
+            )]
+
+        total = len(rows)
+        offset = int(params.get('offset', 0))
+        limit = int(params['limit']) if 'limit' in params else None
+        page = rows[offset:offset + limit if limit is not None else None]
+        data = self.db.project(table, page, items, embed_options)
+
+        headers = {}
+        count_method = prefer.get('count')
+        if count_method in ('exact', 'planned', 'estimated'):
+            # Without table statistics, planned/estimated counts ignore filters like
+            # pg_class.reltuples; the stand-in only distinguishes them when unfiltered
+            counted = len(table.rows) if count_method == 'planned' and not filters else total
+            range_part = f"{offset}-{offset + len(data) - 1}" if data else '*'
+            headers['content-range'] = f"{range_part}/{counted}"
+        else:
+            headers['content-range'] = f"{offset}-{offset + len(data) - 1}/*" if data else '*/*'
+
+        if 'application/vnd.pgrst.object+json' in request.headers.get('accept', ''):
+            if len(data) != 1:
+                raise PostgrestError(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned',
+                                     f'The result contains {len(data)} rows')
+            data = data[0]
+        if request.method == 'HEAD':
+            return httpx.Response(200, headers=headers)
+        return json_response(200, data, headers)
+
+    def _insert(self, request: httpx.Request, table: Table, params: httpx.QueryParams,
+                prefer: Dict[str, str], role: str) -> httpx.Response:
+        if not table.allows(role, 'INSERT'):
+            raise PostgrestError(403, '42501', f'new row violates row-level security policy for table "{table.name}"')
+        body = json.loads(request.content or b'null')
+        payload = body if isinstance(body, list) else [body]
+
+        resolution = prefer.get('resolution')
+        conflict_columns = tuple(c.strip() for c in params['on_conflict'].split(',')) if params.get('on_conflict') else table.primary_key
+        declared = [c.strip().strip('"') for c in params['columns'].split(',')] if params.get('columns') else None
+        missing_default = prefer.get('missing') == 'default'
+
+        results = []
+        # PostgreSQL refuses to let one INSERT ... ON CONFLICT DO UPDATE touch a row twice
+        upserted: Set[Tuple] = set()
+        for values in payload:
+            if declared is not None:
+                values = {k: v for k, v in values.items() if k in declared}
+            null_columns = [c for c in declared if c not in values] if declared is not None and not missing_default else []
+            row = self.db.build_row(table, values, null_columns)
+            if resolution in ('merge-duplicates', 'ignore-duplicates'):
+                row = self.db.compute_generated(table, self.db._fire(table, 'BEFORE', 'INSERT', row, None))
+                existing = table.lookup(conflict_columns, tuple(row[c] for c in conflict_columns))
+                if existing:
+                    if existing[0] in upserted and resolution == 'merge-duplicates':
+                        raise PostgrestError(
+                            400, '21000', 'ON CONFLICT DO UPDATE command cannot affect row a second time',
+                            hint='Ensure that no rows proposed for insertion within the same command have duplicate constrained values.'
+                        )
+                    if resolution == 'merge-duplicates':
+                        if not table.allows(role, 'UPDATE'):
+                            raise PostgrestError(403, '42501', f'new row violates row-level security policy (USING expression) for table "{table.name}"')
+                        provided = set(values) | set(null_columns)
+                        updated = self.db.update_row(table, existing[0], {c: row[c] for c in provided})
+                        upserted.add(table.key_of(updated))
+                        results.append(updated)
+                    continue
+                self.db._check_row(table, row, None)
+                upserted.add(table.key_of(row))
+                self.db._store(table, table.key_of(row), row)
+                self.db._fire(table, 'AFTER', 'INSERT', row, None)
+                results.append(row)
+            else:
+                results.append(self.db.insert_row(table, row))
+
+        return self._representation(201, table, results, params, prefer)
+
+    def _mutate(self, request: httpx.Request, table: Table, params: httpx.QueryParams,
+                filters: List[Any], prefer: Dict[str, str], role: str, command: str) -> httpx.Response:
+        # RLS hides rows the role may not touch, so a denied update/delete affects nothing
+        keys = self.db.filter_rows(table, filters) if table.allows(role, command) else []
+        if command == 'UPDATE':
+            changes = json.loads(request.content or b'{}')
+            results = [self.db.update_row(table, key, changes) for key in keys]
+        else:
+            results = [row for row in (self.db.delete_row(table, key) for key in keys) if row is not None]
+        return self._representation(200, table, results, params, prefer)
+
+    def _representation(self, status: int, table: Table, rows: List[Dict[str, Any]],
+                        params: httpx.QueryParams, prefer: Dict[str, str]) -> httpx.Response:
+        headers = {}
+        if prefer.get('count') in ('exact', 'planned', 'estimated'):
+            headers['content-range'] = f"*/{len(rows)}"
+        if prefer.get('return') != 'representation':
+            return httpx.Response(201 if status == 201 else 204, headers=headers)
+        data = self.db.project(table, rows, parse_select(params.get('select', '*')), {})
+        return json_response(status, data, headers)
+
+    def _rpc(self, request: httpx.Request, name: str, role: str) -> httpx.Response:
+        func = RPC_FUNCTIONS.get(name)
+        if func is None or name not in self.db.functions:
+            raise PostgrestError(404, 'PGRST202', f'Could not find the function public.{name} in the schema cache')
+        if request.method in ('GET', 'HEAD'):
+            args = {k: v for k, v in request.url.params.items() if k not in RESERVED_PARAMS}
+        else:
+            args = json.loads(request.content or b'{}')
+        with self.db.transaction():
+            try:
+                result = func(self.db, role, **args)
+            except TypeError as e:
+                raise PostgrestError(404, 'PGRST202', f'Could not find the function public.{name} with the given arguments: {e}')
+
+        params = request.url.params
+        if isinstance(result, list):
+            filters, _ = self._parse_filters(httpx.QueryParams([
+                (k, v) for k, v in params.multi_items() if request.method == 'POST' or k in RESERVED_PARAMS
+            ]))
+            result = [row for row in result if all(self.db.evaluate(node, row, None) is True for node in filters)]
+            if params.get('order'):
+                result = self.db.order_rows(result, self._parse_order(params['order']))
+            offset = int(params.get('offset', 0))
+            limit = int(params['limit']) if 'limit' in params else None
+            result = result[offset:offset + limit if limit is not None else None]
+        return json_response(200, result)
+
+    # -- Storage --------------------------------------------------------------
+
+    def handle_storage(self, request: httpx.Request, route: str) -> httpx.Response:
+        try:
+            return self._storage_route(request, route)
+        except StorageError as e:
+            return json_response(e.status, e.to_json())
+
+    def _storage_route(self, request: httpx.Request, route: str) -> httpx.Response:
+        storage = self.db.storage
+        authorization = request.headers.get('authorization', '')
+        claims = self.verify_jwt(authorization[7:]) if authorization.lower().startswith('bearer ') else {}
+        role = claims.get('role', 'anon')
+        parts = [part for part in route.split('/') if part]
+
+        if parts[:1] == ['bucket'] and request.method == 'GET':
+            if len(parts) == 1:
+                return json_response(200, [self._bucket_json(bucket) for bucket in storage.buckets.values()])
+            return json_response(200, self._bucket_json(storage.bucket(parts[1])))
+
+        if parts[:2] == ['upload', 'resumable']:
+            return self._tus(request, parts[2] if len(parts) > 2 else None, role, claims.get('sub'))
+        if parts[:1] != ['object'] or len(parts) < 2:
+            raise StorageError(404, 'not_found', f'Unsupported storage route: {route}')
+        if request.method in ('GET', 'HEAD'):
+            public = parts[1] == 'public'
+            if parts[1] in ('public', 'authenticated'):
+                parts = parts[1:]
+            try:
+                stored = storage.get(role, parts[1], '/'.join(parts[2:]), public=public)
+            except StorageError as e:
+                if request.method == 'HEAD':
+                    return httpx.Response(e.status)
+                raise
+            return httpx.Response(200, headers={
+                'content-type': stored['metadata']['mimetype'],
+                'cache-control': stored['metadata']['cacheControl'],
+                'etag': stored['metadata']['eTag']
+            }, content=stored['content'] if request.method == 'GET' else b'')
+        if parts[1] == 'list-v2' and request.method == 'POST' and len(parts) == 3:
+            body = json.loads(request.content or b'{}')
+            return json_response(200, storage.list_page(
+                role, parts[2], body.get('prefix') or '', int(body.get('limit', 1000)),
+                body.get('cursor'), bool(body.get('with_delimiter', False))
+            ))
+        if request.method == 'DELETE' and len(parts) == 2:
+            body = json.loads(request.content or b'{}')
+            return json_response(200, storage.remove(role, parts[1], body.get('prefixes', [])))
+        if request.method in ('POST', 'PUT') and len(parts) >= 3:
+            bucket_id, name = parts[1], '/'.join(parts[2:])
+            form = parse_multipart(request.content, request.headers.get('content-type', ''))
+            if 'file' not in form:
+                raise StorageError(400, 'InvalidRequest', 'No file in the upload')
+            headers, content = form['file']
+            cache_control = form['cacheControl'][1].decode() if 'cacheControl' in form else '3600'
+            stored = storage.put(
+                role, claims.get('sub'), bucket_id, name, content,
+                headers.get('content-type', 'application/octet-stream'), cache_control,
+                upsert=request.headers.get('x-upsert', 'false') == 'true', update=request.method == 'PUT'
+            )
+            return json_response(200, {'Key': f"{bucket_id}/{name}", 'Id': stored['id']})
+        raise StorageError(405, 'InvalidRequest', f'Unsupported storage request: {request.method} {route}')
+
+    def _tus(self, request: httpx.Request, upload_id: Optional[str], role: str,
+             owner: Optional[str]) -> httpx.Response:
+        storage = self.db.storage
+        headers = {'Tus-Resumable': TUS_VERSION}
+        if request.method == 'OPTIONS':
+            return httpx.Response(204, headers={
+                **headers, 'Tus-Version': TUS_VERSION, 'Tus-Extension': TUS_EXTENSIONS,
+                'Tus-Checksum-Algorithm': ','.join(TUS_CHECKSUM_ALGORITHMS), 'Tus-Max-Size': str(TUS_MAX_SIZE)
+            })
+        if request.headers.get('tus-resumable') != TUS_VERSION:
+            return httpx.Response(412, headers={**headers, 'Tus-Version': TUS_VERSION})
+
+        upsert = request.headers.get('x-upsert', 'false') == 'true'
+        metadata = parse_upload_metadata(request.headers.get('upload-metadata', ''))
+        if request.method == 'POST' and upload_id is None:
+            concat = request.headers.get('upload-concat', '')
+            if concat.startswith('final;'):
+                part_ids = [url.rstrip('/').rsplit('/', 1)[-1] for url in concat[len('final;'):].split()]
+                upload = storage.concat_uploads(role, owner, part_ids, metadata, upsert)
+            else:
+                length = request.headers.get('upload-length')
+                upload = storage.create_upload(role, owner, int(length) if length else None, metadata,
+                                               partial=concat == 'partial', upsert=upsert)
+            return httpx.Response(201, headers={
+                **headers, 'Location': f"{LOCAL_SUPABASE_URL}/storage/v1/upload/resumable/{upload['id']}",
+                'Upload-Offset': str(storage.upload_offset(upload))
+            })
+        if upload_id is None:
+            raise StorageError(405, 'InvalidRequest', f'Unsupported resumable request: {request.method}')
+        if request.method == 'HEAD':
+            upload = storage.upload(upload_id)
+            return httpx.Response(200, headers={
+                **headers, 'Upload-Offset': str(storage.upload_offset(upload)),
+                'Upload-Length': str(upload['length']), 'Cache-Control': 'no-store'
+            })
+        if request.method == 'PATCH':
+            if request.headers.get('content-type') != 'application/offset+octet-stream':
+                raise StorageError(415, 'InvalidRequest', 'Content-Type must be application/offset+octet-stream')
+            upload = storage.append_upload(upload_id, int(request.headers.get('upload-offset', -1)),
+                                           request.content, request.headers.get('upload-checksum'))
+            return httpx.Response(204, headers={**headers, 'Upload-Offset': str(storage.upload_offset(upload))})
+        if request.method == 'DELETE':
+            storage.terminate_upload(upload_id)
+            return httpx.Response(204, headers=headers)
+        raise StorageError(405, 'InvalidRequest', f'Unsupported resumable request: {request.method}')
+
+    @staticmethod
+    def _bucket_json(bucket: Dict[str, Any]) -> Dict[str, Any]:
+        created = canonical_timestamp(datetime(2024, 1, 1, tzinfo=timezone.utc))
+        return {
+            'owner': '', 'public': False, 'file_size_limit': None, 'allowed_mime_types': None,
+            'created_at': created, 'updated_at': created, **bucket
+        }
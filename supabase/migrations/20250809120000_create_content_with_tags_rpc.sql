@@ -0,0 +1,86 @@
+-- Create a blog post or project together with its tag links in one call.
+-- Each function runs in a single transaction, so a bad tag id rolls back the
+-- content row as well, and the client needs one round trip instead of three.
+
+-- Helpers the RPCs below need but clients must not call. PostgREST only exposes the
+-- public schema, so they live in private; SECURITY INVOKER callers still need usage.
+CREATE SCHEMA IF NOT EXISTS private;
+REVOKE ALL ON SCHEMA private FROM PUBLIC;
+GRANT USAGE ON SCHEMA private TO authenticated, service_role;
+
+-- Quoted column list of the keys in payload that are insertable columns of target.
+-- Inserting only those columns keeps table defaults for everything omitted,
+-- the same way a PostgREST insert behaves.
+CREATE OR REPLACE FUNCTION private.jsonb_insert_columns(target REGCLASS, payload JSONB)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT string_agg(quote_ident(a.attname), ', ' ORDER BY a.attnum)
+  FROM pg_attribute a
+  WHERE a.attrelid = target
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    AND a.attgenerated = ''
+    AND payload ? a.attname;
+$$;
+
+REVOKE EXECUTE ON FUNCTION private.jsonb_insert_columns(REGCLASS, JSONB) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION private.jsonb_insert_columns(REGCLASS, JSONB) TO authenticated, service_role;
+
+CREATE OR REPLACE FUNCTION public.create_blog_post_with_tags(post JSONB, tag_ids UUID[] DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  insert_columns TEXT := private.jsonb_insert_columns('public.blog_posts'::regclass, post);
+  new_post public.blog_posts;
+  linked UUID[];
+BEGIN
+  IF insert_columns IS NULL THEN
+    RAISE EXCEPTION 'post has no blog_posts columns' USING ERRCODE = '22023';
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO public.blog_posts (%1$s) SELECT %1$s FROM jsonb_populate_record(NULL::public.blog_posts, $1) RETURNING *',
+    insert_columns
+  ) INTO new_post USING post;
+
+  linked := ARRAY(SELECT DISTINCT unnest(COALESCE(tag_ids, '{}')));
+  INSERT INTO public.blog_post_tags (blog_post_id, tag_id)
+  SELECT new_post.id, unnest(linked);
+
+  -- search_vector (added by the full-text search migration) is internal to search
+  RETURN (to_jsonb(new_post) - 'search_vector') || jsonb_build_object('tag_ids', to_jsonb(linked));
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.create_project_with_tags(project JSONB, tag_ids UUID[] DEFAULT '{}')
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  insert_columns TEXT := private.jsonb_insert_columns('public.projects'::regclass, project);
+  new_project public.projects;
+  linked UUID[];
+BEGIN
+  IF insert_columns IS NULL THEN
+    RAISE EXCEPTION 'project has no projects columns' USING ERRCODE = '22023';
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO public.projects (%1$s) SELECT %1$s FROM jsonb_populate_record(NULL::public.projects, $1) RETURNING *',
+    insert_columns
+  ) INTO new_project USING project;
+
+  linked := ARRAY(SELECT DISTINCT unnest(COALESCE(tag_ids, '{}')));
+  INSERT INTO public.project_tags (project_id, tag_id)
+  SELECT new_project.id, unnest(linked);
+
+  RETURN to_jsonb(new_project) || jsonb_build_object('tag_ids', to_jsonb(linked));
+END;
+$$;
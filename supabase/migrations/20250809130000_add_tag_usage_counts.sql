@@ -0,0 +1,119 @@
+-- Per-tag usage counters, kept current by triggers like categories/series article_count,
+-- so "popular tags" reads no longer aggregate blog_post_tags and project_tags
+ALTER TABLE public.tags ADD COLUMN IF NOT EXISTS post_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.tags ADD COLUMN IF NOT EXISTS project_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_tags_post_count ON public.tags(post_count DESC);
+
+-- Backfill from the existing links
+UPDATE public.tags t
+SET post_count = (
+  SELECT count(*)
+  FROM public.blog_post_tags bpt
+  JOIN public.blog_posts bp ON bp.id = bpt.blog_post_id
+  WHERE bpt.tag_id = t.id AND bp.published = true
+),
+project_count = (
+  SELECT count(*)
+  FROM public.project_tags pt
+  WHERE pt.tag_id = t.id
+);
+
+-- post_count counts published posts only. A link to a post that no longer exists
+-- (ON DELETE CASCADE from blog_posts) is skipped here; sync_tag_post_counts()
+-- releases those counts before the post row goes away.
+--
+-- The post is read FOR SHARE. The foreign key check only takes FOR KEY SHARE, which
+-- does not conflict with the FOR NO KEY UPDATE of a concurrent publish flip, so under
+-- READ COMMITTED a link insert could see the post unpublished while the publish
+-- UPDATE could not yet see the link, and neither would count it. FOR SHARE makes the
+-- two wait for each other; whichever runs second sees the other's committed change.
+CREATE OR REPLACE FUNCTION update_tag_post_count()
+RETURNS TRIGGER AS $$
+DECLARE
+  post_published BOOLEAN;
+BEGIN
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    SELECT published INTO post_published FROM public.blog_posts WHERE id = OLD.blog_post_id FOR SHARE;
+    IF post_published THEN
+      UPDATE public.tags
+      SET post_count = GREATEST(post_count - 1, 0)
+      WHERE id = OLD.tag_id;
+    END IF;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT published INTO post_published FROM public.blog_posts WHERE id = NEW.blog_post_id FOR SHARE;
+    IF post_published THEN
+      UPDATE public.tags
+      SET post_count = post_count + 1
+      WHERE id = NEW.tag_id;
+    END IF;
+    RETURN NEW;
+  END IF;
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_tag_project_count()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    UPDATE public.tags
+    SET project_count = GREATEST(project_count - 1, 0)
+    WHERE id = OLD.tag_id;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    UPDATE public.tags
+    SET project_count = project_count + 1
+    WHERE id = NEW.tag_id;
+    RETURN NEW;
+  END IF;
+  RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Publishing, unpublishing or deleting a post moves the counts of every tag it carries
+CREATE OR REPLACE FUNCTION sync_tag_post_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' THEN
+    IF OLD.published IS DISTINCT FROM NEW.published THEN
+      IF NEW.published = true THEN
+        UPDATE public.tags
+        SET post_count = post_count + 1
+        WHERE id IN (SELECT tag_id FROM public.blog_post_tags WHERE blog_post_id = NEW.id);
+      ELSIF OLD.published = true THEN
+        UPDATE public.tags
+        SET post_count = GREATEST(post_count - 1, 0)
+        WHERE id IN (SELECT tag_id FROM public.blog_post_tags WHERE blog_post_id = NEW.id);
+      END IF;
+    END IF;
+    RETURN NEW;
+  ELSIF TG_OP = 'DELETE' THEN
+    IF OLD.published = true THEN
+      UPDATE public.tags
+      SET post_count = GREATEST(post_count - 1, 0)
+      WHERE id IN (SELECT tag_id FROM public.blog_post_tags WHERE blog_post_id = OLD.id);
+    END IF;
+    RETURN OLD;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_tag_post_count_trigger
+  AFTER INSERT OR UPDATE OR DELETE ON public.blog_post_tags
+  FOR EACH ROW EXECUTE FUNCTION update_tag_post_count();
+
+CREATE TRIGGER update_tag_project_count_trigger
+  AFTER INSERT OR UPDATE OR DELETE ON public.project_tags
+  FOR EACH ROW EXECUTE FUNCTION update_tag_project_count();
+
+CREATE TRIGGER sync_tag_post_counts_on_publish
+  AFTER UPDATE ON public.blog_posts
+  FOR EACH ROW EXECUTE FUNCTION sync_tag_post_counts();
+
+-- BEFORE DELETE: the cascaded blog_post_tags deletes can no longer see the post
+CREATE TRIGGER sync_tag_post_counts_on_delete
+  BEFORE DELETE ON public.blog_posts
+  FOR EACH ROW EXECUTE FUNCTION sync_tag_post_counts();
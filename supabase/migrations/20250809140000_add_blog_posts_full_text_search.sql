@@ -0,0 +1,40 @@
+-- Full-text search for blog posts: a weighted tsvector kept in sync by PostgreSQL,
+-- a GIN index over it and a ranked search function, replacing ilike scans over
+-- title/excerpt/content. Matching and ranking read the stored vector, so neither
+-- re-parses the post body. The column is internal: clients select named columns
+-- (never *) and create_blog_post_with_tags() strips it from the row it returns.
+ALTER TABLE public.blog_posts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+  GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'C')
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_blog_posts_search_vector ON public.blog_posts USING GIN (search_vector);
+
+-- search_query uses web search syntax: "quoted phrases", or, -excluded
+CREATE OR REPLACE FUNCTION public.search_blog_posts(
+  search_query TEXT,
+  max_results INTEGER DEFAULT 20,
+  published_only BOOLEAN DEFAULT true
+)
+RETURNS TABLE (
+  id UUID,
+  title TEXT,
+  slug TEXT,
+  excerpt TEXT,
+  created_at TIMESTAMP WITH TIME ZONE,
+  rank REAL
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT p.id, p.title, p.slug, p.excerpt, p.created_at, ts_rank(p.search_vector, q) AS rank
+  FROM public.blog_posts p, websearch_to_tsquery('english', search_query) q
+  WHERE p.search_vector @@ q
+    AND (NOT published_only OR p.published = true)
+  ORDER BY rank DESC, p.created_at DESC
+  LIMIT max_results;
+$$;
@@ -0,0 +1,19 @@
+-- Partial and composite indexes for the public listing queries. Listings filter
+-- published = true and order by created_at, so each index covers both the filter
+-- and the sort; drafts are left out of the partial indexes entirely.
+-- id breaks created_at ties, so keyset pages can use (created_at, id) as an index condition
+CREATE INDEX IF NOT EXISTS idx_blog_posts_published_created_at
+  ON public.blog_posts(created_at DESC, id DESC) WHERE published = true;
+
+CREATE INDEX IF NOT EXISTS idx_blog_posts_published_category_created_at
+  ON public.blog_posts(category_id, created_at DESC) WHERE published = true;
+
+-- Series pages list their published parts in series_order
+CREATE INDEX IF NOT EXISTS idx_blog_posts_published_series_order
+  ON public.blog_posts(series_id, series_order) WHERE published = true;
+
+CREATE INDEX IF NOT EXISTS idx_projects_category_created_at
+  ON public.projects(category_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_projects_featured_created_at
+  ON public.projects(created_at DESC) WHERE featured = true;
@@ -0,0 +1,105 @@
+-- Keyset-paginated feeds of published blog posts and of projects, newest first, with
+-- their tags embedded. A page ends with next_cursor, the (created_at, id) of its last
+-- item; passing it back as after_created_at/after_id continues strictly after that row,
+-- so page 500 costs an index descent instead of reading and discarding 10,000 rows
+-- the way OFFSET does. next_cursor is null on the last page. after_created_at and
+-- after_id go together: a timestamp alone would skip the rows tied on created_at.
+--
+-- Published posts page over idx_blog_posts_published_created_at (created_at, id);
+-- projects get the same index here.
+CREATE INDEX IF NOT EXISTS idx_projects_feed ON public.projects(created_at DESC, id DESC);
+
+CREATE OR REPLACE FUNCTION public.get_blog_post_feed(
+  page_size INTEGER DEFAULT 20,
+  after_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+  after_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+BEGIN
+  IF (after_created_at IS NULL) <> (after_id IS NULL) THEN
+    RAISE EXCEPTION 'after_created_at and after_id must be given together' USING ERRCODE = '22023';
+  END IF;
+
+  RETURN (
+  WITH page AS (
+    SELECT p.id, p.title, p.slug, p.excerpt, p.category_id, p.series_id, p.created_at
+    FROM public.blog_posts p
+    WHERE p.published = true
+      AND (after_created_at IS NULL OR (p.created_at, p.id) < (after_created_at, after_id))
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT LEAST(GREATEST(page_size, 1), 100)
+  ),
+  items AS (
+    SELECT page.*, COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('id', t.id, 'name', t.name, 'slug', t.slug, 'color', t.color) ORDER BY t.name)
+      FROM public.blog_post_tags bpt
+      JOIN public.tags t ON t.id = bpt.tag_id
+      WHERE bpt.blog_post_id = page.id
+    ), '[]'::jsonb) AS tags
+    FROM page
+  )
+  SELECT jsonb_build_object(
+    'items', COALESCE(jsonb_agg(to_jsonb(items) ORDER BY items.created_at DESC, items.id DESC), '[]'::jsonb),
+    'next_cursor', CASE WHEN count(*) = LEAST(GREATEST(page_size, 1), 100) THEN (
+      SELECT jsonb_build_object('created_at', last.created_at, 'id', last.id)
+      FROM items last
+      ORDER BY last.created_at, last.id
+      LIMIT 1
+    ) END
+  )
+  FROM items
+  );
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.get_project_feed(
+  page_size INTEGER DEFAULT 20,
+  after_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+  after_id UUID DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+BEGIN
+  IF (after_created_at IS NULL) <> (after_id IS NULL) THEN
+    RAISE EXCEPTION 'after_created_at and after_id must be given together' USING ERRCODE = '22023';
+  END IF;
+
+  RETURN (
+  WITH page AS (
+    SELECT p.id, p.title, p.description, p.image_url, p.category, p.category_id, p.featured, p.created_at
+    FROM public.projects p
+    WHERE after_created_at IS NULL OR (p.created_at, p.id) < (after_created_at, after_id)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT LEAST(GREATEST(page_size, 1), 100)
+  ),
+  items AS (
+    SELECT page.*, COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('id', t.id, 'name', t.name, 'slug', t.slug, 'color', t.color) ORDER BY t.name)
+      FROM public.project_tags pt
+      JOIN public.tags t ON t.id = pt.tag_id
+      WHERE pt.project_id = page.id
+    ), '[]'::jsonb) AS tags
+    FROM page
+  )
+  SELECT jsonb_build_object(
+    'items', COALESCE(jsonb_agg(to_jsonb(items) ORDER BY items.created_at DESC, items.id DESC), '[]'::jsonb),
+    'next_cursor', CASE WHEN count(*) = LEAST(GREATEST(page_size, 1), 100) THEN (
+      SELECT jsonb_build_object('created_at', last.created_at, 'id', last.id)
+      FROM items last
+      ORDER BY last.created_at, last.id
+      LIMIT 1
+    ) END
+  )
+  FROM items
+  );
+END;
+$$;
@@ -0,0 +1,123 @@
+-- Multi-tag boolean filters: content carrying every tag in all_tags, at least one of
+-- any_tags (when given) and none of none_tags, newest first.
+--
+-- Candidates come from the smallest posting list available: the rarest required tag,
+-- or else the union of any_tags. Rarity is read from the trigger-maintained
+-- tags.post_count / project_count (one primary key lookup per tag) instead of counting
+-- posting lists. post_count leaves out drafts, so with published_only off the pick is
+-- an estimate; results are the same either way. Every other condition is a
+-- (content id, tag_id) primary key probe per candidate, so the cost follows the
+-- rarest tag rather than the most popular one.
+
+CREATE OR REPLACE FUNCTION public.filter_blog_posts_by_tags(
+  all_tags UUID[] DEFAULT '{}',
+  any_tags UUID[] DEFAULT '{}',
+  none_tags UUID[] DEFAULT '{}',
+  max_results INTEGER DEFAULT 50,
+  published_only BOOLEAN DEFAULT true
+)
+RETURNS TABLE (
+  id UUID,
+  title TEXT,
+  slug TEXT,
+  excerpt TEXT,
+  created_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  driver UUID[] := COALESCE(any_tags, '{}');
+BEGIN
+  IF cardinality(all_tags) > 0 THEN
+    -- An unknown tag sorts first and yields no candidates, as no post carries it
+    SELECT ARRAY[r.tag_id] INTO driver
+    FROM unnest(all_tags) AS r(tag_id)
+    LEFT JOIN public.tags t ON t.id = r.tag_id
+    ORDER BY COALESCE(t.post_count, 0)
+    LIMIT 1;
+  END IF;
+
+  RETURN QUERY
+  WITH candidates AS (
+    SELECT DISTINCT d.blog_post_id AS id
+    FROM public.blog_post_tags d
+    WHERE cardinality(driver) > 0 AND d.tag_id = ANY(driver)
+    UNION ALL
+    SELECT p.id FROM public.blog_posts p WHERE cardinality(driver) = 0
+  )
+  SELECT p.id, p.title, p.slug, p.excerpt, p.created_at
+  FROM candidates c
+  JOIN public.blog_posts p ON p.id = c.id
+  WHERE (NOT published_only OR p.published = true)
+    AND NOT EXISTS (
+      SELECT 1 FROM unnest(all_tags) AS r(tag_id)
+      WHERE NOT EXISTS (SELECT 1 FROM public.blog_post_tags x WHERE x.blog_post_id = p.id AND x.tag_id = r.tag_id)
+    )
+    AND (COALESCE(cardinality(any_tags), 0) = 0 OR EXISTS (
+      SELECT 1 FROM public.blog_post_tags x WHERE x.blog_post_id = p.id AND x.tag_id = ANY(any_tags)
+    ))
+    AND NOT EXISTS (
+      SELECT 1 FROM public.blog_post_tags x WHERE x.blog_post_id = p.id AND x.tag_id = ANY(none_tags)
+    )
+  ORDER BY p.created_at DESC, p.id DESC
+  LIMIT max_results;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.filter_projects_by_tags(
+  all_tags UUID[] DEFAULT '{}',
+  any_tags UUID[] DEFAULT '{}',
+  none_tags UUID[] DEFAULT '{}',
+  max_results INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+  id UUID,
+  title TEXT,
+  description TEXT,
+  category TEXT,
+  created_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  driver UUID[] := COALESCE(any_tags, '{}');
+BEGIN
+  IF cardinality(all_tags) > 0 THEN
+    SELECT ARRAY[r.tag_id] INTO driver
+    FROM unnest(all_tags) AS r(tag_id)
+    LEFT JOIN public.tags t ON t.id = r.tag_id
+    ORDER BY COALESCE(t.project_count, 0)
+    LIMIT 1;
+  END IF;
+
+  RETURN QUERY
+  WITH candidates AS (
+    SELECT DISTINCT d.project_id AS id
+    FROM public.project_tags d
+    WHERE cardinality(driver) > 0 AND d.tag_id = ANY(driver)
+    UNION ALL
+    SELECT p.id FROM public.projects p WHERE cardinality(driver) = 0
+  )
+  SELECT p.id, p.title, p.description, p.category, p.created_at
+  FROM candidates c
+  JOIN public.projects p ON p.id = c.id
+  WHERE NOT EXISTS (
+      SELECT 1 FROM unnest(all_tags) AS r(tag_id)
+      WHERE NOT EXISTS (SELECT 1 FROM public.project_tags x WHERE x.project_id = p.id AND x.tag_id = r.tag_id)
+    )
+    AND (COALESCE(cardinality(any_tags), 0) = 0 OR EXISTS (
+      SELECT 1 FROM public.project_tags x WHERE x.project_id = p.id AND x.tag_id = ANY(any_tags)
+    ))
+    AND NOT EXISTS (
+      SELECT 1 FROM public.project_tags x WHERE x.project_id = p.id AND x.tag_id = ANY(none_tags)
+    )
+  ORDER BY p.created_at DESC, p.id DESC
+  LIMIT max_results;
+END;
+$$;
@@ -0,0 +1,202 @@
+-- Precomputed "related content": the top 10 posts (or projects) sharing the most tag
+-- weight with each post (or project). A shared tag weighs 1 / ln(2 + its link count),
+-- so a rare tag in common counts for more than a popular one.
+--
+-- Junction and publish changes only queue (tag, content) pairs; refresh_related_content()
+-- recomputes every row that could have changed, i.e. the queued content plus everything
+-- still carrying a queued tag (a tag's weight only enters pairs that share it). The
+-- pg_cron job at the end of this file runs it every minute, so lists trail edits by at
+-- most a minute and writers never pay for the recomputation.
+
+CREATE TABLE IF NOT EXISTS public.related_blog_posts (
+  blog_post_id UUID NOT NULL REFERENCES public.blog_posts(id) ON DELETE CASCADE,
+  related_id UUID NOT NULL REFERENCES public.blog_posts(id) ON DELETE CASCADE,
+  score DOUBLE PRECISION NOT NULL,
+  shared_tags INTEGER NOT NULL,
+  PRIMARY KEY (blog_post_id, related_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.related_projects (
+  project_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+  related_id UUID NOT NULL REFERENCES public.projects(id) ON DELETE CASCADE,
+  score DOUBLE PRECISION NOT NULL,
+  shared_tags INTEGER NOT NULL,
+  PRIMARY KEY (project_id, related_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.related_content_queue (
+  content_type TEXT NOT NULL CHECK (content_type IN ('blog_posts', 'projects')),
+  tag_id UUID NOT NULL,
+  content_id UUID NOT NULL,
+  PRIMARY KEY (content_type, tag_id, content_id)
+);
+
+ALTER TABLE public.related_blog_posts ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.related_projects ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.related_content_queue ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view related_blog_posts" ON public.related_blog_posts FOR SELECT USING (true);
+CREATE POLICY "Anyone can view related_projects" ON public.related_projects FOR SELECT USING (true);
+CREATE POLICY "Authenticated users can manage related_blog_posts" ON public.related_blog_posts FOR ALL USING (auth.role() = 'authenticated');
+CREATE POLICY "Authenticated users can manage related_projects" ON public.related_projects FOR ALL USING (auth.role() = 'authenticated');
+CREATE POLICY "Authenticated users can manage related_content_queue" ON public.related_content_queue FOR ALL USING (auth.role() = 'authenticated');
+
+-- Lookups read one source's rows best first
+CREATE INDEX IF NOT EXISTS idx_related_blog_posts_score ON public.related_blog_posts(blog_post_id, score DESC);
+CREATE INDEX IF NOT EXISTS idx_related_projects_score ON public.related_projects(project_id, score DESC);
+
+-- The ad-hoc overlap query; refresh_related_* store its result. Only published posts
+-- are offered as related posts.
+CREATE OR REPLACE FUNCTION public.compute_related_blog_posts(target UUID, top_k INTEGER DEFAULT 10)
+RETURNS TABLE (related_id UUID, score DOUBLE PRECISION, shared_tags INTEGER)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT other.blog_post_id, sum(w.weight)::DOUBLE PRECISION, count(*)::INTEGER
+  FROM public.blog_post_tags mine
+  CROSS JOIN LATERAL (
+    SELECT 1.0 / ln(2 + count(*)) AS weight FROM public.blog_post_tags u WHERE u.tag_id = mine.tag_id
+  ) w
+  JOIN public.blog_post_tags other ON other.tag_id = mine.tag_id AND other.blog_post_id <> target
+  JOIN public.blog_posts p ON p.id = other.blog_post_id AND p.published = true
+  WHERE mine.blog_post_id = target
+  GROUP BY other.blog_post_id
+  ORDER BY 2 DESC, 1
+  LIMIT top_k;
+$$;
+
+CREATE OR REPLACE FUNCTION public.compute_related_projects(target UUID, top_k INTEGER DEFAULT 10)
+RETURNS TABLE (related_id UUID, score DOUBLE PRECISION, shared_tags INTEGER)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT other.project_id, sum(w.weight)::DOUBLE PRECISION, count(*)::INTEGER
+  FROM public.project_tags mine
+  CROSS JOIN LATERAL (
+    SELECT 1.0 / ln(2 + count(*)) AS weight FROM public.project_tags u WHERE u.tag_id = mine.tag_id
+  ) w
+  JOIN public.project_tags other ON other.tag_id = mine.tag_id AND other.project_id <> target
+  WHERE mine.project_id = target
+  GROUP BY other.project_id
+  ORDER BY 2 DESC, 1
+  LIMIT top_k;
+$$;
+
+CREATE OR REPLACE FUNCTION public.refresh_related_content()
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  post_ids UUID[];
+  project_ids UUID[];
+BEGIN
+  WITH changed AS (
+    DELETE FROM public.related_content_queue RETURNING content_type, tag_id, content_id
+  ),
+  affected AS (
+    SELECT c.content_type, c.content_id AS id FROM changed c
+    UNION
+    SELECT 'blog_posts', bpt.blog_post_id
+    FROM changed c JOIN public.blog_post_tags bpt ON bpt.tag_id = c.tag_id
+    WHERE c.content_type = 'blog_posts'
+    UNION
+    SELECT 'projects', pt.project_id
+    FROM changed c JOIN public.project_tags pt ON pt.tag_id = c.tag_id
+    WHERE c.content_type = 'projects'
+  )
+  SELECT array_agg(a.id) FILTER (WHERE a.content_type = 'blog_posts'),
+         array_agg(a.id) FILTER (WHERE a.content_type = 'projects')
+  INTO post_ids, project_ids
+  FROM affected a;
+
+  -- Deleted content is gone from the junction and, by cascade, from the related tables
+  DELETE FROM public.related_blog_posts WHERE blog_post_id = ANY(post_ids);
+  INSERT INTO public.related_blog_posts (blog_post_id, related_id, score, shared_tags)
+  SELECT source.id, r.related_id, r.score, r.shared_tags
+  FROM unnest(COALESCE(post_ids, '{}')) AS source(id)
+  JOIN public.blog_posts p ON p.id = source.id
+  CROSS JOIN LATERAL public.compute_related_blog_posts(source.id) r;
+
+  DELETE FROM public.related_projects WHERE project_id = ANY(project_ids);
+  INSERT INTO public.related_projects (project_id, related_id, score, shared_tags)
+  SELECT source.id, r.related_id, r.score, r.shared_tags
+  FROM unnest(COALESCE(project_ids, '{}')) AS source(id)
+  JOIN public.projects p ON p.id = source.id
+  CROSS JOIN LATERAL public.compute_related_projects(source.id) r;
+
+  RETURN jsonb_build_object(
+    'blog_posts', COALESCE(cardinality(post_ids), 0),
+    'projects', COALESCE(cardinality(project_ids), 0)
+  );
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION enqueue_related_content()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'blog_post_tags' THEN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+      INSERT INTO public.related_content_queue VALUES ('blog_posts', OLD.tag_id, OLD.blog_post_id)
+      ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      INSERT INTO public.related_content_queue VALUES ('blog_posts', NEW.tag_id, NEW.blog_post_id)
+      ON CONFLICT DO NOTHING;
+    END IF;
+  ELSE
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+      INSERT INTO public.related_content_queue VALUES ('projects', OLD.tag_id, OLD.project_id)
+      ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+      INSERT INTO public.related_content_queue VALUES ('projects', NEW.tag_id, NEW.project_id)
+      ON CONFLICT DO NOTHING;
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Publishing or unpublishing a post adds it to, or drops it from, its tag-mates' lists
+CREATE OR REPLACE FUNCTION enqueue_related_blog_post_publish()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF OLD.published IS DISTINCT FROM NEW.published THEN
+    INSERT INTO public.related_content_queue
+    SELECT 'blog_posts', tag_id, NEW.id FROM public.blog_post_tags WHERE blog_post_id = NEW.id
+    ON CONFLICT DO NOTHING;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER enqueue_related_blog_post_tags
+  AFTER INSERT OR UPDATE OR DELETE ON public.blog_post_tags
+  FOR EACH ROW EXECUTE FUNCTION enqueue_related_content();
+
+CREATE TRIGGER enqueue_related_project_tags
+  AFTER INSERT OR UPDATE OR DELETE ON public.project_tags
+  FOR EACH ROW EXECUTE FUNCTION enqueue_related_content();
+
+CREATE TRIGGER enqueue_related_blog_post_publish
+  AFTER UPDATE ON public.blog_posts
+  FOR EACH ROW EXECUTE FUNCTION enqueue_related_blog_post_publish();
+
+-- Queue every existing link so the first refresh fills both tables
+INSERT INTO public.related_content_queue
+SELECT 'blog_posts', tag_id, blog_post_id FROM public.blog_post_tags
+ON CONFLICT DO NOTHING;
+INSERT INTO public.related_content_queue
+SELECT 'projects', tag_id, project_id FROM public.project_tags
+ON CONFLICT DO NOTHING;
+
+-- Drain the queue every minute. The job runs as the migration's owner, so row level
+-- security does not apply; cron.schedule() replaces an existing job of the same name.
+CREATE EXTENSION IF NOT EXISTS pg_cron WITH SCHEMA pg_catalog;
+SELECT cron.schedule('refresh-related-content', '* * * * *', 'SELECT public.refresh_related_content()');
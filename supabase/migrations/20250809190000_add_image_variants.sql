@@ -0,0 +1,61 @@
+-- Responsive derivatives of the originals in the images bucket. Listings store a single
+-- image_url/featured_image_url per card, so every card downloads the full-size upload.
+-- Derivatives are WebP and AVIF renditions at fixed widths under content-hashed keys
+-- (variants/<sha256>.<ext>, immutable and cacheable forever), recorded here by whoever
+-- renders them; today that is only ImageDerivativePipeline in fileupload_test.py, run
+-- by hand over a set of sources. Nothing renders them on upload yet, and the app's
+-- listings do not call pick_image_variants() yet: it is the lookup they would use to
+-- get the smallest rendition that still fills a card, falling back to the original.
+
+-- AVIF renditions live in the images bucket next to the originals
+INSERT INTO storage.buckets (id, name, public, file_size_limit, allowed_mime_types)
+VALUES
+  ('images', 'images', true, 52428800, ARRAY['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif', 'image/svg+xml'])
+ON CONFLICT (id) DO UPDATE SET
+  allowed_mime_types = EXCLUDED.allowed_mime_types;
+
+CREATE TABLE IF NOT EXISTS public.image_variants (
+  source_path TEXT NOT NULL,
+  format TEXT NOT NULL CHECK (format IN ('avif', 'webp')),
+  width INTEGER NOT NULL,
+  height INTEGER NOT NULL,
+  path TEXT NOT NULL,
+  bytes INTEGER NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  PRIMARY KEY (source_path, format, width)
+);
+
+ALTER TABLE public.image_variants ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view image_variants" ON public.image_variants FOR SELECT USING (true);
+CREATE POLICY "Authenticated users can manage image_variants" ON public.image_variants FOR ALL USING (auth.role() = 'authenticated');
+
+-- For each source (an object path in the images bucket or its public URL, as stored in
+-- image_url), the narrowest variant at least min_width wide in the first of formats the
+-- source has, or its widest one when none is that wide. Sources without variants are
+-- left out, so callers keep the original URL for them.
+CREATE OR REPLACE FUNCTION public.pick_image_variants(
+  sources TEXT[],
+  min_width INTEGER,
+  formats TEXT[] DEFAULT ARRAY['avif', 'webp']
+)
+RETURNS TABLE (
+  source TEXT,
+  path TEXT,
+  format TEXT,
+  width INTEGER,
+  height INTEGER,
+  bytes INTEGER
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT DISTINCT ON (s.source) s.source, v.path, v.format, v.width, v.height, v.bytes
+  FROM unnest(sources) AS s(source)
+  JOIN public.image_variants v
+    ON v.source_path = regexp_replace(s.source, '^.*/storage/v1/object/public/images/', '')
+  JOIN unnest(formats) WITH ORDINALITY AS f(format, preference) ON f.format = v.format
+  ORDER BY s.source, f.preference, (v.width < min_width), CASE WHEN v.width >= min_width THEN v.width ELSE -v.width END;
+$$;
@@ -0,0 +1,123 @@
+-- Content-addressed media: one stored object per distinct file per bucket. The uploader
+-- hashes the file (SHA-256, streamed) and stores it at cas/<hash>/<random>.<ext>. A duplicate
+-- upload, such as the same screenshot reused in several projects' additional_images,
+-- only adds a reference to the object that is already there. Every user of a file is
+-- a row in media_references, so an object is removed only when its last reference
+-- is released.
+--
+-- Upload flow: claim_media_object() records the reference and says whether the object
+-- already exists. If it does not, the client uploads it and calls confirm_media_object().
+-- Releasing is release_media_reference(): it returns the path to remove once nothing
+-- references the object any more, and null otherwise.
+
+CREATE TABLE IF NOT EXISTS public.media_objects (
+  bucket_id TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  path TEXT NOT NULL,
+  bytes BIGINT NOT NULL,
+  mime_type TEXT,
+  uploaded_at TIMESTAMP WITH TIME ZONE,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  PRIMARY KEY (bucket_id, content_hash)
+);
+
+-- referrer names the user of the file, e.g. 'projects/<id>/additional_images'
+CREATE TABLE IF NOT EXISTS public.media_references (
+  bucket_id TEXT NOT NULL,
+  content_hash TEXT NOT NULL,
+  referrer TEXT NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+  PRIMARY KEY (bucket_id, content_hash, referrer),
+  FOREIGN KEY (bucket_id, content_hash) REFERENCES public.media_objects(bucket_id, content_hash) ON DELETE CASCADE
+);
+
+ALTER TABLE public.media_objects ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.media_references ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view media_objects" ON public.media_objects FOR SELECT USING (true);
+CREATE POLICY "Authenticated users can manage media_objects" ON public.media_objects FOR ALL USING (auth.role() = 'authenticated');
+CREATE POLICY "Authenticated users can manage media_references" ON public.media_references FOR ALL USING (auth.role() = 'authenticated');
+
+-- Listing a referrer's files
+CREATE INDEX IF NOT EXISTS idx_media_references_referrer ON public.media_references(referrer);
+
+-- Record referrer's use of the file with content_hash. If no upload has been confirmed
+-- yet, object_path becomes the object's path and 'existing' is false, which tells the
+-- caller to upload. Concurrent claims of a new file all upload identical bytes to the
+-- same key, so the race cannot leave a wrong object behind.
+CREATE OR REPLACE FUNCTION public.claim_media_object(
+  bucket TEXT,
+  content_hash TEXT,
+  object_path TEXT,
+  object_bytes BIGINT,
+  referrer TEXT,
+  mime_type TEXT DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  media public.media_objects;
+BEGIN
+  INSERT INTO public.media_objects (bucket_id, content_hash, path, bytes, mime_type)
+  VALUES (bucket, claim_media_object.content_hash, object_path, object_bytes, claim_media_object.mime_type)
+  ON CONFLICT ON CONSTRAINT media_objects_pkey DO NOTHING;
+
+  SELECT * INTO media FROM public.media_objects m
+  WHERE m.bucket_id = bucket AND m.content_hash = claim_media_object.content_hash
+  FOR UPDATE;
+
+  INSERT INTO public.media_references (bucket_id, content_hash, referrer)
+  VALUES (bucket, claim_media_object.content_hash, claim_media_object.referrer)
+  ON CONFLICT ON CONSTRAINT media_references_pkey DO NOTHING;
+
+  RETURN jsonb_build_object('path', media.path, 'bytes', media.bytes, 'existing', media.uploaded_at IS NOT NULL);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.confirm_media_object(bucket TEXT, content_hash TEXT)
+RETURNS VOID
+LANGUAGE sql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  UPDATE public.media_objects m SET uploaded_at = COALESCE(m.uploaded_at, now())
+  WHERE m.bucket_id = bucket AND m.content_hash = confirm_media_object.content_hash;
+$$;
+
+-- Drop referrer's use of the file. Returns the object's path when that was the last
+-- reference, after deleting its media_objects row; the caller then removes the object.
+CREATE OR REPLACE FUNCTION public.release_media_reference(bucket TEXT, content_hash TEXT, referrer TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+DECLARE
+  media public.media_objects;
+BEGIN
+  SELECT * INTO media FROM public.media_objects m
+  WHERE m.bucket_id = bucket AND m.content_hash = release_media_reference.content_hash
+  FOR UPDATE;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  DELETE FROM public.media_references r
+  WHERE r.bucket_id = bucket AND r.content_hash = release_media_reference.content_hash
+    AND r.referrer = release_media_reference.referrer;
+
+  IF EXISTS (
+    SELECT 1 FROM public.media_references r
+    WHERE r.bucket_id = bucket AND r.content_hash = release_media_reference.content_hash
+  ) THEN
+    RETURN NULL;
+  END IF;
+
+  DELETE FROM public.media_objects m
+  WHERE m.bucket_id = bucket AND m.content_hash = release_media_reference.content_hash;
+  RETURN media.path;
+END;
+$$;
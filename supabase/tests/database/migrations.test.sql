@@ -0,0 +1,70 @@
+-- Runs the functions and triggers from supabase/migrations against real Postgres
+-- (`supabase test db`). local_supabase.py re-implements them in Python, so plpgsql
+-- errors that only surface at call time, such as ambiguous column references,
+-- would otherwise go unnoticed.
+BEGIN;
+CREATE EXTENSION IF NOT EXISTS pgtap WITH SCHEMA extensions;
+
+SELECT plan(22);
+
+INSERT INTO public.tags (name, slug) VALUES ('Smoke A', 'smoke-a'), ('Smoke B', 'smoke-b');
+
+-- Atomic creation with tags and the usage count triggers
+SELECT lives_ok($$
+  SELECT public.create_blog_post_with_tags(
+    jsonb_build_object('title', 'Smoke post', 'slug', 'smoke-post', 'content', 'Keyset smoke body', 'published', true),
+    ARRAY(SELECT id FROM public.tags WHERE slug IN ('smoke-a', 'smoke-b'))
+  )
+$$, 'create_blog_post_with_tags');
+SELECT lives_ok($$
+  SELECT public.create_project_with_tags(
+    jsonb_build_object('title', 'Smoke project', 'description', 'Smoke', 'category', 'Web Development'),
+    ARRAY(SELECT id FROM public.tags WHERE slug = 'smoke-a')
+  )
+$$, 'create_project_with_tags');
+SELECT hasnt_function('public', 'jsonb_insert_columns', 'jsonb_insert_columns is not exposed as an RPC');
+SELECT ok(has_function_privilege('authenticated', 'private.jsonb_insert_columns(regclass, jsonb)', 'EXECUTE'),
+  'authenticated may run the create RPCs');
+SELECT ok(NOT has_function_privilege('anon', 'private.jsonb_insert_columns(regclass, jsonb)', 'EXECUTE'),
+  'anon may not call jsonb_insert_columns');
+SELECT is((SELECT post_count FROM public.tags WHERE slug = 'smoke-a'), 1, 'post_count follows blog_post_tags');
+SELECT is((SELECT project_count FROM public.tags WHERE slug = 'smoke-a'), 1, 'project_count follows project_tags');
+UPDATE public.blog_posts SET published = false WHERE slug = 'smoke-post';
+SELECT is((SELECT post_count FROM public.tags WHERE slug = 'smoke-b'), 0, 'unpublishing releases post_count');
+UPDATE public.blog_posts SET published = true WHERE slug = 'smoke-post';
+
+-- Search, feeds and tag filters
+SELECT ok(EXISTS (SELECT 1 FROM public.search_blog_posts('keyset smoke') WHERE slug = 'smoke-post'), 'search_blog_posts');
+SELECT lives_ok($$ SELECT public.get_blog_post_feed(20) $$, 'get_blog_post_feed');
+SELECT lives_ok($$ SELECT public.get_project_feed(20, now(), gen_random_uuid()) $$, 'get_project_feed with a cursor');
+SELECT throws_ok($$ SELECT public.get_blog_post_feed(20, now(), NULL) $$, '22023');
+SELECT ok(EXISTS (
+  SELECT 1 FROM public.filter_blog_posts_by_tags(ARRAY(SELECT id FROM public.tags WHERE slug IN ('smoke-a', 'smoke-b')))
+  WHERE slug = 'smoke-post'
+), 'filter_blog_posts_by_tags');
+SELECT lives_ok($$ SELECT * FROM public.filter_projects_by_tags('{}', ARRAY(SELECT id FROM public.tags WHERE slug = 'smoke-a')) $$,
+  'filter_projects_by_tags');
+
+-- Related content and image variants
+SELECT lives_ok($$ SELECT public.refresh_related_content() $$, 'refresh_related_content');
+SELECT is((SELECT schedule FROM cron.job WHERE jobname = 'refresh-related-content'), '* * * * *',
+  'refresh_related_content is scheduled every minute');
+INSERT INTO public.image_variants (source_path, format, width, height, path, bytes)
+VALUES ('smoke/photo.jpg', 'webp', 640, 427, 'variants/smoke.webp', 1024);
+SELECT is((SELECT path FROM public.pick_image_variants(ARRAY['smoke/photo.jpg'], 320)), 'variants/smoke.webp', 'pick_image_variants');
+
+-- Content-addressed media: claim, confirm, release
+SELECT is(
+  public.claim_media_object('images', 'smokehash', 'cas/smokehash/a.png', 10, 'projects/a') ->> 'existing', 'false',
+  'first claim asks for an upload'
+);
+SELECT lives_ok($$ SELECT public.confirm_media_object('images', 'smokehash') $$, 'confirm_media_object');
+SELECT is(
+  public.claim_media_object('images', 'smokehash', 'cas/smokehash/b.png', 10, 'projects/b') ->> 'path', 'cas/smokehash/a.png',
+  'second claim reuses the object'
+);
+SELECT is(public.release_media_reference('images', 'smokehash', 'projects/a'), NULL, 'object kept while referenced');
+SELECT is(public.release_media_reference('images', 'smokehash', 'projects/b'), 'cas/smokehash/a.png', 'last release frees the object');
+
+SELECT * FROM finish();
+ROLLBACK;
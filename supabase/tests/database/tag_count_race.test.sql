@@ -0,0 +1,88 @@
+-- Races blog_post_tags writes against publish flips of the same post from two separate
+-- sessions (dblink), which the serialized local backend cannot reproduce. Their writes
+-- commit, so the fixture is deleted again at the end.
+BEGIN;
+CREATE EXTENSION IF NOT EXISTS pgtap WITH SCHEMA extensions;
+CREATE EXTENSION IF NOT EXISTS dblink WITH SCHEMA extensions;
+
+SELECT plan(4);
+
+DO $$
+BEGIN
+  PERFORM dblink_connect('race_link', 'host=127.0.0.1 port=5432 dbname=postgres user=postgres password=postgres');
+  PERFORM dblink_connect('race_publish', 'host=127.0.0.1 port=5432 dbname=postgres user=postgres password=postgres');
+  -- A second published post keeps the count above zero, so GREATEST(..., 0) cannot
+  -- hide a double decrement
+  PERFORM dblink_exec('race_link', $sql$
+    INSERT INTO public.tags (name, slug) VALUES ('Race tag', 'race-tag');
+    INSERT INTO public.blog_posts (title, slug, content, published) VALUES
+      ('Race post', 'race-post', 'Race', false),
+      ('Race anchor', 'race-anchor', 'Race', true);
+    INSERT INTO public.blog_post_tags (blog_post_id, tag_id)
+    SELECT p.id, t.id FROM public.blog_posts p, public.tags t WHERE p.slug = 'race-anchor' AND t.slug = 'race-tag';
+  $sql$);
+
+  -- Link the tag while the post is unpublished and keep that transaction open, then
+  -- publish from the other session
+  PERFORM dblink_exec('race_link', 'BEGIN');
+  PERFORM dblink_exec('race_link', $sql$
+    INSERT INTO public.blog_post_tags (blog_post_id, tag_id)
+    SELECT p.id, t.id FROM public.blog_posts p, public.tags t WHERE p.slug = 'race-post' AND t.slug = 'race-tag'
+  $sql$);
+  PERFORM dblink_send_query('race_publish', $sql$UPDATE public.blog_posts SET published = true WHERE slug = 'race-post'$sql$);
+  PERFORM pg_sleep(0.5);
+END;
+$$;
+
+SELECT is(dblink_is_busy('race_publish'), 1, 'publishing waits for the open link insert');
+
+DO $$
+BEGIN
+  PERFORM dblink_exec('race_link', 'COMMIT');
+  -- Drain the UPDATE's result and the end-of-results marker
+  PERFORM * FROM dblink_get_result('race_publish') AS r(status TEXT);
+  PERFORM * FROM dblink_get_result('race_publish') AS r(status TEXT);
+END;
+$$;
+
+SELECT is((SELECT post_count FROM public.tags WHERE slug = 'race-tag'), 2,
+  'a link inserted while the post was being published is counted');
+
+-- The reverse: unlinking while the post is being unpublished releases the count once
+DO $$
+BEGIN
+  PERFORM dblink_exec('race_link', 'BEGIN');
+  PERFORM dblink_exec('race_link', $sql$
+    DELETE FROM public.blog_post_tags WHERE blog_post_id = (SELECT id FROM public.blog_posts WHERE slug = 'race-post')
+  $sql$);
+  PERFORM dblink_send_query('race_publish', $sql$UPDATE public.blog_posts SET published = false WHERE slug = 'race-post'$sql$);
+  PERFORM pg_sleep(0.5);
+END;
+$$;
+
+SELECT is(dblink_is_busy('race_publish'), 1, 'unpublishing waits for the open unlink');
+
+DO $$
+BEGIN
+  PERFORM dblink_exec('race_link', 'COMMIT');
+  PERFORM * FROM dblink_get_result('race_publish') AS r(status TEXT);
+  PERFORM * FROM dblink_get_result('race_publish') AS r(status TEXT);
+END;
+$$;
+
+SELECT is((SELECT post_count FROM public.tags WHERE slug = 'race-tag'), 1,
+  'an unlink racing an unpublish releases the count once');
+
+DO $$
+BEGIN
+  PERFORM dblink_exec('race_link', $sql$
+    DELETE FROM public.blog_posts WHERE slug IN ('race-post', 'race-anchor');
+    DELETE FROM public.tags WHERE slug = 'race-tag';
+  $sql$);
+  PERFORM dblink_disconnect('race_link');
+  PERFORM dblink_disconnect('race_publish');
+END;
+$$;
+
+SELECT * FROM finish();
+ROLLBACK;